@@ -0,0 +1,217 @@
+import configparser
+import functools
+import hashlib
+from collections import Counter
+from fractions import Fraction
+from pathlib import Path
+
+import av
+import numpy as np
+from manim import config, logger
+from manim.animation.composition import Succession
+from manim.scene.scene_file_writer import SceneFileWriter, to_av_frame_rate
+from manim.utils.file_ops import write_to_movie
+
+CONFIG_FILE = Path(__file__).with_name("manim.cfg")
+
+# Сколько состояний анимации снимать для оценки движения
+MOTION_SAMPLES = 24
+COLOR_ARRAYS = ("fill_rgbas", "stroke_rgbas")
+
+
+def read_settings(config_file=CONFIG_FILE):
+    parser = configparser.ConfigParser()
+    parser.read(config_file, encoding="utf-8")
+    section = parser["adaptive_fps"] if parser.has_section("adaptive_fps") else {}
+    output = section.get("output", "vfr").strip().lower()
+    if output not in ("vfr", "duplicate"):
+        raise ValueError(f"[adaptive_fps] output: ожидалось vfr или duplicate, получено {output!r}")
+    return {
+        "max_step_px": float(section.get("max_step_px", "3")),
+        "max_color_step": float(section.get("max_color_step", "12")),
+        "min_fps": float(section.get("min_fps", "10")),
+        "output": output,
+    }
+
+
+# === ОЦЕНКА ДВИЖЕНИЯ ===
+
+def snapshot(members):
+    return [
+        (member.points.copy(), *(getattr(member, name).copy() for name in COLOR_ARRAYS))
+        for member in members
+    ]
+
+
+def max_change(before, after):
+    # Наибольшее смещение точки (в единицах сцены) и изменение канала RGBA (0-255)
+    step, color_step = 0.0, 0.0
+    for old, new in zip(before, after):
+        if any(a.shape != b.shape for a, b in zip(old, new)):
+            return np.inf, np.inf
+        if len(old[0]):
+            step = max(step, float(np.linalg.norm(new[0] - old[0], axis=1).max()))
+        for a, b in zip(old[1:], new[1:]):
+            if a.size:
+                color_step = max(color_step, 255 * float(np.abs(b - a).max()))
+    return step, color_step
+
+
+def estimate_motion(scene, frame_rate):
+    # Снимаем состояния анимаций в MOTION_SAMPLES точках и берем худший
+    # участок: смещение и смена цвета на один кадр полной частоты
+    animations = scene.animations or []
+    if scene.duration <= 0 or scene.stop_condition is not None:
+        # wait_until может оборвать play() до последнего кадра
+        return np.inf, np.inf
+    members = [member for mob in scene.moving_mobjects for member in mob.family_members_with_points()]
+    if any(isinstance(animation, Succession) for animation in animations):
+        # Succession запускает вложенные анимации по ходу - пробная прокрутка их сломала бы
+        return np.inf, np.inf
+    if any(mob.get_family_updaters() for mob in scene.moving_mobjects):
+        # Апдейтеры зависят от dt, заранее их не прокрутить
+        return np.inf, np.inf
+
+    times = np.linspace(0, scene.duration, MOTION_SAMPLES + 1)
+    states = []
+    for t in times:
+        for animation in animations:
+            animation.interpolate(min(t / animation.run_time, 1) if animation.run_time else 1)
+        states.append(snapshot(members))
+    for animation in animations:
+        animation.interpolate(0)
+
+    step, color_step = 0.0, 0.0
+    frames_per_sample = (times[1] - times[0]) * frame_rate
+    for before, after in zip(states, states[1:]):
+        sample_step, sample_color = max_change(before, after)
+        step = max(step, sample_step / frames_per_sample)
+        color_step = max(color_step, sample_color / frames_per_sample)
+    return step, color_step
+
+
+def choose_stride(step_px, color_step, frame_rate, settings):
+    # Самый большой шаг (делитель частоты), при котором ошибка под порогом
+    stride = 1
+    for candidate in range(2, int(frame_rate // settings["min_fps"]) + 1):
+        if frame_rate % candidate:
+            continue
+        if candidate * step_px <= settings["max_step_px"] and candidate * color_step <= settings["max_color_step"]:
+            stride = candidate
+    return stride
+
+
+# === ЗАПИСЬ ===
+
+@functools.lru_cache(maxsize=None)
+def adaptive_fps_writer(base):
+    class AdaptiveFpsFileWriter(base):
+        # В режиме vfr кадр, который держится N кадров, кодируется один раз,
+        # следующий получает pts через N; в duplicate - N копий (без растеризации)
+        def open_partial_movie_stream(self, file_path=None):
+            super().open_partial_movie_stream(file_path)
+            self.next_pts = 0
+
+        def encode_and_write_frame(self, frame, num_frames):
+            if self.renderer.fps_settings["output"] != "vfr":
+                return super().encode_and_write_frame(frame, num_frames)
+            av_frame = av.VideoFrame.from_ndarray(frame, format="rgba")
+            av_frame.pts = self.next_pts
+            av_frame.time_base = Fraction(1) / to_av_frame_rate(config.frame_rate)
+            for packet in self.video_stream.encode(av_frame):
+                self.video_container.mux(packet)
+            self.next_pts += num_frames
+
+        # Частичные файлы режима не смешиваются с файлами полной частоты
+        def is_already_cached(self, hash_invocation):
+            return super().is_already_cached(f"{hash_invocation}_{self.renderer.fps_tag}")
+
+        def add_partial_movie_file(self, hash_animation):
+            if hash_animation is not None:
+                hash_animation = f"{hash_animation}_{self.renderer.fps_tag}"
+            super().add_partial_movie_file(hash_animation)
+
+    return AdaptiveFpsFileWriter
+
+
+# === РЕНДЕРЕР ===
+
+class AdaptiveFpsMixin:
+    # Для каждого play() оценивает движение и растеризует только каждый
+    # stride-й кадр (и последний); пропущенные кадры держит предыдущий
+    def __init__(self, *args, **kwargs):
+        kwargs["file_writer_class"] = adaptive_fps_writer(kwargs.get("file_writer_class", SceneFileWriter))
+        self.fps_settings = read_settings()
+        self.fps_tag = "afps" + hashlib.sha256(repr(sorted(self.fps_settings.items())).encode()).hexdigest()[:8]
+        super().__init__(*args, **kwargs)
+        self.frame_stride = 1
+        self.play_frames = 0
+        self.pending_frames = None
+        self.fps_stats = Counter()
+        self.fps_report = []
+
+    def save_static_frame_data(self, scene, static_mobjects):
+        result = super().save_static_frame_data(scene, static_mobjects)
+        self.frame_stride = 1
+        if self.skip_animations or not write_to_movie():
+            return result
+
+        frame_rate = config.frame_rate
+        self.play_frames = len(np.arange(0, scene.duration, 1 / frame_rate))
+        step, color_step = estimate_motion(scene, frame_rate)
+        pixels_per_unit = self.camera.pixel_width / self.camera.frame_width
+        self.frame_stride = choose_stride(step * pixels_per_unit, color_step, frame_rate, self.fps_settings)
+        self.fps_report.append({
+            "index": self.num_plays,
+            "fps": frame_rate / self.frame_stride,
+            "step_px": step * pixels_per_unit,
+            "color_step": color_step,
+        })
+        return result
+
+    def render(self, scene, time, moving_mobjects):
+        if self.skip_animations:
+            return super().render(scene, time, moving_mobjects)
+        stride = self.frame_stride
+        self.fps_stats["frames"] += 1
+        if stride > 1:
+            index = int(round(time * config.frame_rate))
+            last = self.play_frames - 1
+            if index % stride and index != last:
+                return
+            # Последний кадр рендерится всегда: длительность и конечное состояние точные
+            self.pending_frames = 1 if index >= last else min(index + stride, last) - index
+        self.fps_stats["rendered"] += 1
+        try:
+            super().render(scene, time, moving_mobjects)
+        finally:
+            self.pending_frames = None
+
+    def add_frame(self, frame, num_frames=1):
+        if self.pending_frames is not None:
+            num_frames = self.pending_frames
+        super().add_frame(frame, num_frames)
+
+    def freeze_current_frame(self, duration):
+        # Удерживаемый кадр в vfr - последний в своем файле: без замыкающего
+        # кадра (pts = N-1, как в held_frames) файл длился бы один кадр
+        num_frames = int(duration / (1 / self.camera.frame_rate))
+        if self.fps_settings["output"] != "vfr" or num_frames < 2:
+            return super().freeze_current_frame(duration)
+        frame = self.get_frame()
+        self.add_frame(frame, num_frames=num_frames - 1)
+        self.add_frame(frame, num_frames=1)
+
+    def play(self, scene, *args, **kwargs):
+        try:
+            super().play(scene, *args, **kwargs)
+        finally:
+            self.frame_stride = 1
+
+    def scene_finished(self, scene):
+        super().scene_finished(scene)
+        frames, rendered = self.fps_stats["frames"], self.fps_stats["rendered"]
+        if frames:
+            reduced = sum(entry["fps"] < config.frame_rate for entry in self.fps_report)
+            logger.info(f"adaptive_fps: растеризовано {rendered} из {frames} кадров "
+                        f"({100 * rendered / frames:.0f}%), анимаций на пониженной частоте: {reduced}")
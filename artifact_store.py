@@ -0,0 +1,444 @@
+import argparse
+import configparser
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import stat
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+CONFIG_FILE = ROOT / "manim.cfg"
+MB = 1024 * 1024
+
+MOVIE_SUFFIXES = {".mp4", ".mov", ".webm", ".gif"}
+SVG_SUFFIXES = {".svg", ".tex"}
+# Файлы, которые manim может переписать на месте (итоговое видео, uncached_*):
+# жесткая ссылка испортила бы все копии, для них только reflink
+IMMUTABLE_KINDS = {"partial", "svg"}
+# Свежие файлы пропускаем: их еще может дописывать рендер
+MIN_AGE_SECONDS = 60
+FILE_LIST = "partial_movie_file_list.txt"
+
+# Linux: клонирование файла с общими блоками (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    suffix TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    inode INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refs_hash ON refs (hash);
+"""
+
+
+def read_settings(config_file=CONFIG_FILE):
+    parser = configparser.ConfigParser()
+    parser.read(config_file, encoding="utf-8")
+    section = parser["artifact_store"] if parser.has_section("artifact_store") else {}
+    link = section.get("link", "hardlink").strip().lower()
+    if link not in ("hardlink", "reflink"):
+        raise ValueError(f"[artifact_store] link: ожидалось hardlink или reflink, получено {link!r}")
+    return {
+        "media_dir": ROOT / section.get("media_dir", "media"),
+        "root": ROOT / section.get("root", "media/store"),
+        "link": link,
+    }
+
+
+# === ФАЙЛЫ ===
+
+def file_digest(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(MB), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def reflink(source, target):
+    import fcntl
+
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        Path(target).unlink(missing_ok=True)
+        raise
+
+
+def artifact_kind(path):
+    if path.suffix in SVG_SUFFIXES:
+        return "svg"
+    if path.suffix in MOVIE_SUFFIXES:
+        if "partial_movie_files" in path.parts and not path.name.startswith("uncached_"):
+            return "partial"
+        return "video"
+    return None
+
+
+def iter_artifacts(media_dir, skip_dirs):
+    # os.walk с отсечением хранилища и кэша tex_cache (он уже адресуется по хешу)
+    skip_dirs = {Path(path).resolve() for path in skip_dirs}
+    for directory, subdirs, files in os.walk(media_dir):
+        subdirs[:] = [name for name in subdirs if (Path(directory) / name).resolve() not in skip_dirs]
+        for name in files:
+            path = Path(directory) / name
+            kind = artifact_kind(path)
+            if kind is not None:
+                yield path, kind
+
+
+# === ХРАНИЛИЩЕ ===
+
+class ArtifactStore:
+    # objects/<aa>/<bb>/<sha256><суффикс> - по одному экземпляру содержимого;
+    # файлы в media/ - жесткие ссылки (или reflink) на объекты, refs в index.sqlite
+    # хранит, кто на какой объект ссылается
+    def __init__(self, media_dir=None, root=None, link=None):
+        settings = read_settings()
+        self.media_dir = Path(media_dir or settings["media_dir"])
+        self.root = Path(root or settings["root"])
+        self.link = link or settings["link"]
+        # Сбрасывается при первой неудаче: ФС без reflink, итоговые видео дальше не хешируем
+        self.reflink_supported = True
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        with self.connect() as db:
+            db.executescript(SCHEMA)
+
+    def connect(self):
+        db = sqlite3.connect(self.root / "index.sqlite", timeout=60)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def object_path(self, digest, suffix):
+        # Два уровня каталогов: листинг одного каталога не растет с числом объектов
+        return self.objects_dir / digest[:2] / digest[2:4] / f"{digest}{suffix}"
+
+    # --- дедупликация ---
+
+    def link_file(self, source, target, kind):
+        # Атомарно: ссылка во временное имя, затем rename поверх цели
+        tmp = target.with_name(f".{target.name}.store-tmp")
+        tmp.unlink(missing_ok=True)
+        if kind in IMMUTABLE_KINDS and self.link == "hardlink":
+            try:
+                os.link(source, tmp)
+                os.replace(tmp, target)
+                return "hardlink"
+            except OSError:
+                tmp.unlink(missing_ok=True)
+        try:
+            reflink(source, tmp)
+        except (OSError, ImportError):
+            self.reflink_supported = False
+            return None
+        # Права - как у заменяемого файла, а не у объекта только для чтения
+        shutil.copymode(target if target.exists() else source, tmp)
+        os.replace(tmp, target)
+        return "reflink"
+
+    def add_object(self, path, kind, digest):
+        obj = self.object_path(digest, path.suffix)
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        mode = self.link_file(path, obj, kind)
+        if mode == "hardlink":
+            # Общий inode только для чтения: случайная запись на месте не пройдет
+            obj.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        return mode
+
+    def ingest(self, dry_run=False):
+        stats = Counter()
+        now = time.time()
+        with self.connect() as db:
+            refs = {row["path"]: row for row in db.execute("SELECT * FROM refs")}
+            seen = set()
+            for path, kind in iter_artifacts(self.media_dir, [self.root, self.media_dir / "cache"]):
+                stats["files"] += 1
+                info = path.stat()
+                if now - info.st_mtime < MIN_AGE_SECONDS:
+                    stats["too_fresh"] += 1
+                    continue
+                if kind not in IMMUTABLE_KINDS and not self.reflink_supported:
+                    stats["unsupported"] += 1
+                    continue
+                ref = refs.get(str(path))
+                if ref is not None and (ref["size"], ref["mtime"], ref["inode"]) == (
+                        info.st_size, info.st_mtime, info.st_ino):
+                    stats["unchanged"] += 1
+                    continue
+
+                digest = file_digest(path)
+                stats["hashed"] += 1
+                obj = self.object_path(digest, path.suffix)
+                if dry_run:
+                    if digest in seen or (obj.exists() and obj.stat().st_ino != info.st_ino):
+                        stats["duplicates"] += 1
+                        stats["saved_bytes"] += info.st_size
+                    seen.add(digest)
+                    continue
+
+                if not obj.exists():
+                    mode = self.add_object(path, kind, digest)
+                    if mode is None:
+                        # Итоговое видео без поддержки reflink: не копируем, иначе место удвоится
+                        stats["unsupported"] += 1
+                        continue
+                    db.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?)",
+                               (digest, path.suffix, info.st_size, now))
+                    stats["objects"] += 1
+                elif obj.stat().st_ino == info.st_ino:
+                    mode = "hardlink"
+                else:
+                    mode = self.link_file(obj, path, kind)
+                    if mode is None:
+                        stats["unsupported"] += 1
+                        continue
+                    stats["duplicates"] += 1
+                    stats["saved_bytes"] += info.st_size
+
+                info = path.stat()
+                db.execute("INSERT OR REPLACE INTO refs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                           (str(path), digest, kind, mode, info.st_size, info.st_mtime, info.st_ino))
+        return stats
+
+    # --- подсчет ссылок ---
+
+    def ref_is_valid(self, ref):
+        # Ссылка жива, пока файл на месте и не переписан (для hardlink - тот же inode)
+        try:
+            info = os.stat(ref["path"])
+        except OSError:
+            return False
+        if ref["mode"] == "hardlink":
+            return info.st_ino == ref["inode"]
+        return (info.st_size, info.st_mtime) == (ref["size"], ref["mtime"])
+
+    def collect(self, dry_run=False):
+        # Объект удаляется, когда на него не осталось живых ссылок
+        freed, freed_bytes = [], 0
+        with self.connect() as db:
+            dead = [ref["path"] for ref in db.execute("SELECT * FROM refs") if not self.ref_is_valid(ref)]
+            if not dry_run:
+                db.executemany("DELETE FROM refs WHERE path = ?", [(path,) for path in dead])
+            dead = set(dead)
+            counts = Counter(row["hash"] for row in db.execute("SELECT path, hash FROM refs") if row["path"] not in dead)
+            for row in db.execute("SELECT * FROM objects").fetchall():
+                if counts[row["hash"]]:
+                    continue
+                obj = self.object_path(row["hash"], row["suffix"])
+                try:
+                    info = obj.stat()
+                except OSError:
+                    info = None
+                # Место освобождается, только если это последняя ссылка на inode
+                if info is not None and info.st_nlink == 1:
+                    freed_bytes += info.st_size
+                freed.append(obj)
+                if not dry_run:
+                    obj.unlink(missing_ok=True)
+                    db.execute("DELETE FROM objects WHERE hash = ?", (row["hash"],))
+        return freed, freed_bytes
+
+    def report(self):
+        with self.connect() as db:
+            objects = db.execute("SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS size FROM objects").fetchone()
+            by_kind = db.execute("SELECT kind, COUNT(*) AS n, SUM(size) AS size FROM refs GROUP BY kind").fetchall()
+        logical = sum(row["size"] for row in by_kind)
+        return {
+            "objects": objects["n"],
+            "stored_bytes": objects["size"],
+            "referenced_bytes": logical,
+            "saved_bytes": logical - objects["size"],
+            "refs": {row["kind"]: {"files": row["n"], "bytes": row["size"]} for row in by_kind},
+        }
+
+
+# === СВЯЗЬ СО СЦЕНАМИ ===
+
+def partial_references(directory):
+    # Нужные сегменты живой сцены: последняя склейка manim и манифесты incremental
+    from incremental import MANIFEST_PREFIX
+
+    keep, known = set(), False
+    file_list = directory / FILE_LIST
+    if file_list.exists():
+        known = True
+        for line in file_list.read_text(encoding="utf-8").splitlines():
+            if line.startswith("file '"):
+                keep.add(Path(line[len("file '"):-1].removeprefix("file:")).name)
+    for manifest in directory.glob(f"{MANIFEST_PREFIX}*.json"):
+        known = True
+        keep.update(json.loads(manifest.read_text(encoding="utf-8"))["files"])
+    return keep if known else None
+
+
+def stale_scene_files(media_dir, scene_files):
+    # media/videos/<модуль>/<качество>/<Сцена>.mp4 и partial_movie_files/<Сцена>/
+    from incremental import defined_scenes
+
+    modules = {Path(file).stem: defined_scenes(file) for file in scene_files}
+    stale = []
+    for quality_dir in sorted(Path(media_dir).glob("videos/*/*")):
+        scenes = modules.get(quality_dir.parent.name)
+        if scenes is None or not quality_dir.is_dir():
+            continue
+        for video in quality_dir.iterdir():
+            if video.is_file() and video.suffix in MOVIE_SUFFIXES and video.stem not in scenes:
+                stale.append(video)
+        for directory in sorted((quality_dir / "partial_movie_files").glob("*")):
+            if not directory.is_dir():
+                continue
+            if directory.name not in scenes:
+                stale.extend(path for path in directory.iterdir() if path.is_file())
+                continue
+            keep = partial_references(directory)
+            if keep is None:
+                # Без списка склейки и манифестов нельзя сказать, какие сегменты нужны
+                continue
+            stale.extend(
+                path for path in directory.iterdir()
+                if path.is_file() and path.suffix in MOVIE_SUFFIXES and path.name not in keep
+            )
+    return stale
+
+
+def live_svg_files(scene_files):
+    # Прогон всех сцен в dry_run: какие SVG/TeX они реально запрашивают
+    from manim import Scene
+    from manim.mobject.text import tex_mobject, text_mobject
+
+    import tex_cache
+    from incremental import defined_scenes
+    from segment_render import capture_timeline, load_scene_class
+
+    # Подмена tex_cache ставится до наших оберток, иначе импорт main.py их перезапишет
+    tex_cache.install()
+    live = set()
+    original_tex, original_text = tex_mobject.tex_to_svg_file, text_mobject.Text._text2svg
+
+    def recording_tex(*args, **kwargs):
+        path = Path(original_tex(*args, **kwargs))
+        live.update({path.resolve(), path.with_suffix(".tex").resolve()})
+        return path
+
+    def recording_text(self, *args, **kwargs):
+        path = original_text(self, *args, **kwargs)
+        live.add(Path(path).resolve())
+        return path
+
+    tex_mobject.tex_to_svg_file, text_mobject.Text._text2svg = recording_tex, recording_text
+    try:
+        for file in scene_files:
+            for name in sorted(defined_scenes(file)):
+                scene_class = load_scene_class(file, name)
+                if isinstance(scene_class, type) and issubclass(scene_class, Scene):
+                    capture_timeline(file, name)
+    finally:
+        tex_mobject.tex_to_svg_file, text_mobject.Text._text2svg = original_tex, original_text
+    return live
+
+
+def collect_garbage(store, scene_files, svg=True, dry_run=False):
+    victims = stale_scene_files(store.media_dir, scene_files)
+    if svg:
+        # Упавший прогон сцены прерывает сборку: без полного списка SVG не удаляем
+        live = live_svg_files(scene_files)
+        for directory in ("Tex", "texts"):
+            for path in sorted((store.media_dir / directory).glob("*")):
+                if path.suffix in SVG_SUFFIXES and path.resolve() not in live:
+                    victims.append(path)
+
+    reclaimed = 0
+    for path in victims:
+        info = path.stat()
+        if info.st_nlink == 1:
+            reclaimed += info.st_size
+        if not dry_run:
+            path.unlink()
+    if not dry_run:
+        for directory in store.media_dir.glob("videos/*/*/partial_movie_files/*"):
+            if directory.is_dir() and not any(directory.iterdir()):
+                directory.rmdir()
+
+    freed, freed_bytes = store.collect(dry_run)
+    if dry_run:
+        # Объекты, которые останутся без ссылок после удаления victims
+        victim_paths = {str(path) for path in victims}
+        with store.connect() as db:
+            refs = db.execute("SELECT path, hash FROM refs").fetchall()
+            sizes = {row["hash"]: row["size"] for row in db.execute("SELECT hash, size FROM objects")}
+        remaining = Counter(ref["hash"] for ref in refs if ref["path"] not in victim_paths)
+        orphaned = {ref["hash"] for ref in refs if ref["path"] in victim_paths and not remaining[ref["hash"]]}
+        freed_bytes += sum(sizes.get(digest, 0) for digest in orphaned)
+    return victims, freed, reclaimed + freed_bytes
+
+
+def print_report(report):
+    print(f"Объектов: {report['objects']}, на диске {report['stored_bytes'] / MB:.1f} МБ, "
+          f"ссылок на {report['referenced_bytes'] / MB:.1f} МБ, "
+          f"сэкономлено {report['saved_bytes'] / MB:.1f} МБ")
+    for kind, item in sorted(report["refs"].items()):
+        print(f"  {kind:<8} {item['files']:>6} файлов  {item['bytes'] / MB:8.1f} МБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Хранилище артефактов media/ по хешу содержимого")
+    parser.add_argument("--media-dir", default=None)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="заменить одинаковые файлы ссылками на один объект")
+    ingest.add_argument("--dry-run", action="store_true")
+    gc = commands.add_parser("gc", help="удалить артефакты сцен, которых больше нет, и объекты без ссылок")
+    gc.add_argument("--scenes", nargs="+", default=["main.py"], help="файлы с актуальными сценами")
+    gc.add_argument("--no-svg", action="store_true", help="не прогонять сцены и не трогать SVG/TeX")
+    gc.add_argument("--dry-run", action="store_true", help="только показать, что будет удалено")
+    report = commands.add_parser("report", help="объем хранилища и экономия")
+    report.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    store = ArtifactStore(media_dir=args.media_dir)
+    if args.command == "ingest":
+        stats = store.ingest(args.dry_run)
+        print(f"Файлов {stats['files']}, без изменений {stats['unchanged']}, хешировано {stats['hashed']}, "
+              f"новых объектов {stats['objects']}, дубликатов {stats['duplicates']} "
+              f"({stats['saved_bytes'] / MB:.1f} МБ), свежих пропущено {stats['too_fresh']}, "
+              f"без поддержки reflink {stats['unsupported']}")
+    elif args.command == "gc":
+        victims, freed, reclaimed = collect_garbage(store, args.scenes, not args.no_svg, args.dry_run)
+        for path in victims:
+            print(path)
+        action = "будет освобождено" if args.dry_run else "освобождено"
+        print(f"Файлов в media/: {len(victims)}, объектов хранилища: {len(freed)}, "
+              f"{action} {reclaimed / MB:.1f} МБ")
+    elif args.command == "report":
+        result = store.report()
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print_report(result)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Запуск:
+# python artifact_store.py ingest              # после рендеров: одинаковые файлы -> ссылки на объекты
+# python artifact_store.py gc --dry-run        # что удалится для сцен, которых нет в main.py
+# python artifact_store.py gc
+# python artifact_store.py report
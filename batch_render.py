@@ -0,0 +1,217 @@
+import argparse
+import contextlib
+import csv
+import importlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+MAIN_FILE = Path(__file__).with_name("main.py")
+# Лежит в каталоге задачи, пока она рендерится: после падения пула по нему
+# видно, какие задачи были в работе
+RENDERING_MARKER = ".rendering"
+
+
+# === ЗАГРУЗКА ТАБЛИЦЫ ПАРАМЕТРОВ ===
+
+def load_jobs(path):
+    # CSV с заголовком или JSON-список объектов; колонка name необязательна
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for index, row in enumerate(rows):
+        row = dict(row)
+        name = str(row.pop("name", "") or f"GeometryProblem_{index:03d}")
+        params = {key: float(value) for key, value in row.items() if value not in ("", None)}
+        jobs.append({"name": name, "params": params})
+
+    names = [job["name"] for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Повторяющиеся имена задач: {', '.join(duplicates)}")
+    return jobs
+
+
+# === РЕНДЕР ОДНОЙ ЗАДАЧИ (в процессе пула) ===
+
+def job_config(job, out_dir, quality=None):
+    # Свой каталог видео и частичных файлов на задачу, чтобы параллельные
+    # рендеры одной сцены не перетирали partial_movie_files друг друга
+    job_dir = Path(out_dir).absolute() / job["name"]
+    options = {
+        "input_file": str(MAIN_FILE),
+        "output_file": job["name"],
+        "video_dir": str(job_dir),
+        "partial_movie_dir": str(job_dir / "partial_movie_files"),
+        "preview": False,
+        "progress_bar": "none",
+    }
+    if quality:
+        options["quality"] = quality
+    return options
+
+
+@contextlib.contextmanager
+def scene_config(module_name, options):
+    # Модуль сцены задает config.frame_rate при импорте, то есть до tempconfig
+    # задачи, а пресет quality в tempconfig применяется после обычных ключей
+    # config и вернул бы fps пресета. Частота модуля ставится поверх настроек
+    # задачи - как в одиночном рендере manim -q*, где пресет идет до импорта
+    module = importlib.import_module(module_name)
+    from manim import config, tempconfig
+
+    frame_rate = config.frame_rate
+    with tempconfig(options), tempconfig({"frame_rate": frame_rate}):
+        yield module
+
+
+def rendering_marker(job, out_dir):
+    return Path(out_dir).absolute() / job["name"] / RENDERING_MARKER
+
+
+def crashed_result(job):
+    return {"name": job["name"], "params": job["params"], "ok": False,
+            "output": None, "error": "Процесс рендера аварийно завершился", "seconds": 0.0}
+
+
+def render_job(job, out_dir, quality=None):
+    start = time.perf_counter()
+    result = {"name": job["name"], "params": job["params"], "ok": False, "output": None, "error": None}
+    marker = rendering_marker(job, out_dir)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(str(os.getpid()), encoding="utf-8")
+    try:
+        from memory_budget import peak_rss_mb
+
+        with scene_config("main", job_config(job, out_dir, quality)) as main:
+            scene = main.GeometryProblem(params=job["params"])
+            scene.render()
+            result["output"] = str(scene.renderer.file_writer.movie_file_path)
+        # Пик процесса-воркера: включает предыдущие задачи этого процесса
+        result["peak_rss_mb"] = peak_rss_mb()
+        result["ok"] = True
+    except Exception:
+        result["error"] = traceback.format_exc()
+    finally:
+        marker.unlink(missing_ok=True)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+# === ПАКЕТНЫЙ ЗАПУСК ===
+
+def render_pool(jobs, out_dir, workers, quality, report):
+    # Возвращает задачи, не завершенные из-за падения процесса пула: после
+    # BrokenProcessPool исключение получают все ожидающие futures, а не одна
+    unfinished = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = {pool.submit(render_job, job, out_dir, quality): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                report(future.result())
+            except BrokenProcessPool:
+                unfinished.append(job)
+    return unfinished
+
+
+def render_isolated(job, out_dir, quality):
+    # Отдельный процесс на одну задачу: падение - точно ее
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(render_job, job, out_dir, quality).result()
+        except BrokenProcessPool:
+            return crashed_result(job)
+        finally:
+            rendering_marker(job, out_dir).unlink(missing_ok=True)
+
+
+def run_batch(jobs, out_dir, workers=None, quality=None):
+    workers = workers or os.cpu_count() or 1
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    results = []
+
+    def report(result):
+        results.append(result)
+        status = "OK  " if result["ok"] else "FAIL"
+        print(f"[{status}] {result['name']} ({result['seconds']:.1f} с)", flush=True)
+
+    pending = list(jobs)
+    while pending:
+        unfinished = render_pool(pending, out_dir, workers, quality, report)
+        if not unfinished:
+            break
+        # Процесс пула упал (например, segfault в cairo). Задачи, которые были
+        # в работе, перезапускаются по одной - ошибкой помечается только та,
+        # что роняет процесс; остальные уходят в новый пул
+        suspects = [job for job in unfinished if rendering_marker(job, out_dir).exists()] or unfinished
+        for job in suspects:
+            rendering_marker(job, out_dir).unlink(missing_ok=True)
+        print(f"Процесс рендера аварийно завершился: {len(suspects)} задач(и) перезапуск по одной, "
+              f"{len(unfinished) - len(suspects)} - в новом пуле", flush=True)
+        for job in suspects:
+            report(render_isolated(job, out_dir, quality))
+        pending = [job for job in unfinished if job not in suspects]
+
+    elapsed = time.perf_counter() - start
+    succeeded = sum(result["ok"] for result in results)
+    return {
+        "workers": workers,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "wall_seconds": elapsed,
+        "scenes_per_minute": 60 * succeeded / elapsed if elapsed else 0.0,
+        "jobs": sorted(results, key=lambda result: result["name"]),
+    }
+
+
+def print_summary(summary):
+    print()
+    print(f"Сцен: {summary['total']}, успешно: {summary['succeeded']}, ошибок: {summary['failed']}")
+    print(f"Процессов: {summary['workers']}, время: {summary['wall_seconds']:.1f} с, "
+          f"производительность: {summary['scenes_per_minute']:.2f} сцен/мин")
+    for result in summary["jobs"]:
+        if not result["ok"]:
+            print(f"\n--- {result['name']} ---\n{result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пакетный рендер вариантов GeometryProblem")
+    parser.add_argument("table", help="CSV или JSON с параметрами задач")
+    parser.add_argument("-o", "--out-dir", default="media/batch", help="каталог для видео")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="число процессов (по умолчанию все ядра)")
+    parser.add_argument("-q", "--quality", default=None,
+                        help="качество manim: low_quality, medium_quality, high_quality, ...")
+    args = parser.parse_args()
+
+    summary = run_batch(load_jobs(args.table), args.out_dir, args.workers, args.quality)
+    print_summary(summary)
+    with open(Path(args.out_dir) / "summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    raise SystemExit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Пример таблицы (CSV):
+# name,side_length,e_ratio,f_ratio,ef_length,area
+# base,5,0.4,0.6,17,170
+# wide,6,0.3,0.5,13,91
+#
+# Запуск:
+# python batch_render.py variants.csv -o media/batch -q high_quality
@@ -0,0 +1,82 @@
+import numpy as np
+from manim import Animation, VMobject
+from manim.utils.bezier import interpolate
+from manim.utils.iterables import stretch_array_to_length
+
+RGBA_ATTRS = ("fill_rgbas", "stroke_rgbas", "background_stroke_rgbas")
+# Остальное, что интерполирует VMobject.interpolate_color (set_stroke(width=...))
+SCALAR_ATTRS = ("stroke_width", "background_stroke_width", "sheen_factor", "sheen_direction")
+
+
+class BatchedStyle(Animation):
+    # Замена group.animate.set_opacity(...) / .set_color(...) для больших групп:
+    # цвета всех членов семейства лежат в одном буфере, и кадр - одна
+    # векторная операция вместо интерполяции каждого подобъекта. Толщины и
+    # блик интерполируются по отдельности и только у тех членов, где метод их
+    # изменил. Точки не трогаются: метод должен менять только стиль
+    def __init__(self, mobject, method, *args, method_kwargs=None, **kwargs):
+        self.method = method
+        self.method_args = args
+        self.method_kwargs = method_kwargs or {}
+        super().__init__(mobject, **kwargs)
+
+    def begin(self):
+        target = self.mobject.copy()
+        getattr(target, self.method)(*self.method_args, **self.method_kwargs)
+        members = self.mobject.family_members_with_points()
+        targets = target.family_members_with_points()
+        if len(members) != len(targets) or not all(isinstance(mob, VMobject) for mob in members):
+            raise TypeError(f"BatchedStyle({self.method}): нужна группа VMobject с неизменной структурой")
+
+        starts, ends, self.slots, self.scalars = [], [], [], []
+        offset = 0
+        for member, member_target in zip(members, targets):
+            if not np.array_equal(member.points, member_target.points):
+                raise TypeError(f"BatchedStyle({self.method}): метод меняет точки, нужен обычный .animate")
+            for attr in SCALAR_ATTRS:
+                start, end = getattr(member, attr), getattr(member_target, attr)
+                if not np.array_equal(start, end):
+                    self.scalars.append((member, attr, start, end))
+            for attr in RGBA_ATTRS:
+                start, end = getattr(member, attr), getattr(member_target, attr)
+                # Выравнивание длин как в VMobject.align_rgbas
+                length = max(len(start), len(end))
+                starts.append(stretch_array_to_length(start, length))
+                ends.append(stretch_array_to_length(end, length))
+                self.slots.append((member, attr, offset, offset + length))
+                offset += length
+
+        self.start = np.concatenate(starts) if starts else np.zeros((0, 4))
+        self.delta = np.concatenate(ends) - self.start if ends else np.zeros((0, 4))
+        self.buffer = self.start.copy()
+        # Члены семейства смотрят в общий буфер: кадр обновляет всех сразу
+        for member, attr, begin, end in self.slots:
+            setattr(member, attr, self.buffer[begin:end])
+        super().begin()
+
+    def interpolate_mobject(self, alpha):
+        alpha = self.rate_func(alpha)
+        np.multiply(self.delta, alpha, out=self.buffer)
+        self.buffer += self.start
+        for member, attr, start, end in self.scalars:
+            setattr(member, attr, interpolate(start, end, alpha))
+
+    def finish(self):
+        super().finish()
+        # Отвязываем массивы от буфера, чтобы дальнейшие set_* работали как обычно
+        for member, attr, begin, end in self.slots:
+            setattr(member, attr, self.buffer[begin:end].copy())
+        self.slots = []
+        for member, attr, start, end in self.scalars:
+            setattr(member, attr, end.copy() if isinstance(end, np.ndarray) else end)
+        self.scalars = []
+
+    def clean_up_from_scene(self, scene):
+        super().clean_up_from_scene(scene)
+        # VGroup, собранную из объектов сцены только для анимации, сцена
+        # добавила поверх всего; убираем ее, и члены снова рисуются в своем порядке
+        if self.mobject not in scene.mobjects:
+            return
+        on_scene = {id(member) for mob in scene.mobjects if mob is not self.mobject for member in mob.get_family()}
+        if all(id(member) in on_scene for member in self.mobject.family_members_with_points()):
+            scene.remove(self.mobject)
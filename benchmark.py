@@ -0,0 +1,284 @@
+import argparse
+import configparser
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from manim import *
+
+from dashed import DashedPolyline
+import glyph_atlas
+import tex_cache
+from memory_budget import peak_rss_mb
+
+ROOT = Path(__file__).parent
+BASELINE_FILE = ROOT / "benchmark_baseline.json"
+OUT_DIR = ROOT / "media" / "benchmark"
+
+
+def cfg_pixels():
+    parser = configparser.ConfigParser()
+    parser.read(ROOT / "manim.cfg", encoding="utf-8")
+    return parser.getint("CLI", "pixel_width", fallback=854), parser.getint("CLI", "pixel_height", fallback=480)
+
+
+# Уровни качества: размер кадра из manim.cfg (30 fps) и финальный 1080p60
+# (config.frame_rate = 60 в main.py); None - взять размер из manim.cfg
+PROFILES = {
+    "480p30": (None, 30),
+    "1080p60": ((1920, 1080), 60),
+}
+
+CASES = {
+    "geometry_problem": ("main.py", "GeometryProblem"),
+    "dashed_polygons": ("benchmark.py", "DashedPolygonsStress"),
+    "dashed_polylines": ("benchmark.py", "DashedPolylinesStress"),
+    "mathtex_labels": ("benchmark.py", "MathTexLabelsStress"),
+    "point_labels": ("benchmark.py", "PointLabelsStress"),
+    "rotation_sequence": ("benchmark.py", "RotationSequenceStress"),
+}
+
+# Состояние кэша LaTeX/Text на время прогона: cold - пустой каталог на каждый
+# повтор, warm - каталог, заполненный неучтенным прогревочным прогоном. Общий
+# media/cache не используется: результат не зависит от истории машины
+TEX_CACHE_STATES = ("cold", "warm")
+
+# Метрика -> True, если рост значения означает ухудшение
+METRICS = {
+    "wall_seconds": True,
+    "frames_per_second": False,
+    "peak_rss_mb": True,
+    "output_bytes": True,
+}
+
+
+# === СИНТЕТИЧЕСКИЕ СЦЕНЫ ===
+
+class DashedPolygonsStress(Scene):
+    def construct(self):
+        shapes = VGroup(*[
+            DashedVMobject(RegularPolygon(n=3 + i % 5, radius=0.7, color=RED, stroke_width=4), num_dashes=75)
+            for i in range(24)
+        ]).arrange_in_grid(4, 6, buff=0.4)
+        self.play(Create(shapes))
+        self.play(Rotate(shapes, angle=PI / 2))
+        self.play(shapes.animate.set_opacity(0.3))
+        self.wait(1)
+
+
+class DashedPolylinesStress(Scene):
+    # То же, что DashedPolygonsStress, но на DashedPolyline из dashed.py
+    def construct(self):
+        shapes = VGroup(*[
+            DashedPolyline(*RegularPolygon(n=3 + i % 5, radius=0.7).get_vertices(),
+                           num_dashes=75, color=RED, stroke_width=4)
+            for i in range(24)
+        ]).arrange_in_grid(4, 6, buff=0.4)
+        self.play(Create(shapes))
+        self.play(Rotate(shapes, angle=PI / 2))
+        self.play(shapes.animate.set_opacity(0.3))
+        self.wait(1)
+
+
+class MathTexLabelsStress(Scene):
+    def construct(self):
+        labels = VGroup(*[
+            MathTex(f"S_{{\\triangle {i}}}={10 * i}", font_size=28)
+            for i in range(40)
+        ]).arrange_in_grid(8, 5, buff=0.4)
+        self.play(Write(labels))
+        self.play(labels.animate.set_color(YELLOW))
+        self.wait(1)
+
+
+class PointLabelsStress(Scene):
+    # Много одинаковых подписей точек из glyph_atlas; подписи стоят, движется точка
+    def construct(self):
+        names = ["A", "B", "C", "D", "E", "F", "E'", "(B')"]
+        labels = VGroup(*[
+            glyph_atlas.text(names[i % len(names)], font_size=24) if i % 3 else
+            glyph_atlas.tex("45^\\circ" if i % 2 else "\\alpha", font_size=36, color=YELLOW)
+            for i in range(96)
+        ]).arrange_in_grid(8, 12, buff=0.5)
+        dot = Dot(labels.get_corner(UL), color=RED)
+        self.play(Write(labels))
+        self.play(MoveAlongPath(dot, Line(labels.get_corner(UL), labels.get_corner(DR))), run_time=2)
+        self.wait(1)
+
+
+class RotationSequenceStress(Scene):
+    def construct(self):
+        A = np.array([-2, 2, 0])
+        triangle = DashedVMobject(Polygon(A, [2, 2, 0], [2, 0, 0], color=RED, stroke_width=4), num_dashes=75)
+        self.add(triangle)
+        for _ in range(12):
+            self.play(Rotate(triangle, angle=-PI / 2, about_point=A), run_time=0.5)
+
+
+# === ОДИН ПРОГОН (в отдельном процессе) ===
+
+class CountingRenderer(CairoRenderer):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.frames = 0
+
+    def add_frame(self, frame, num_frames=1):
+        if not self.skip_animations:
+            self.frames += num_frames
+        super().add_frame(frame, num_frames)
+
+
+def run_case(case, profile, cache_dir):
+    from segment_render import load_scene_class
+
+    # До импорта сцены: tex_cache.install() в main.py вернет уже этот кэш
+    cache_dir = Path(cache_dir)
+    tex_cache.install(cache_dir=cache_dir / "store", shared_dirs=[], max_bytes=None)
+    file_name, scene_name = CASES[case]
+    options = {
+        "input_file": str(ROOT / file_name),
+        "media_dir": str(OUT_DIR),
+        # .tex/.svg самого manim тоже кэшируются - там же, а не в media_dir
+        "tex_dir": str(cache_dir / "Tex"),
+        "text_dir": str(cache_dir / "texts"),
+        "output_file": f"{case}_{profile}",
+        "disable_caching": True,
+        "preview": False,
+        "progress_bar": "none",
+    }
+    with tempconfig(options):
+        scene_class = load_scene_class(ROOT / file_name, scene_name)
+        # Профиль применяем после импорта сцены: main.py сам выставляет frame_rate
+        pixels, frame_rate = PROFILES[profile]
+        pixel_width, pixel_height = pixels or cfg_pixels()
+        config.update({"pixel_width": pixel_width, "pixel_height": pixel_height, "frame_rate": frame_rate})
+        renderer = CountingRenderer()
+        scene = scene_class(renderer=renderer, random_seed=0)
+        start = time.perf_counter()
+        scene.render()
+        wall = time.perf_counter() - start
+        output = Path(renderer.file_writer.movie_file_path)
+
+    return {
+        "wall_seconds": wall,
+        "frames": renderer.frames,
+        "frames_per_second": renderer.frames / wall if wall else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "output_bytes": output.stat().st_size if output.exists() else None,
+    }
+
+
+def run_isolated(case, profile, cache_dir):
+    process = subprocess.run(
+        [sys.executable, str(Path(__file__).absolute()), "_case", case, profile, str(cache_dir)],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"{case}/{profile} завершился с ошибкой:\n{process.stderr}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def run_cached(case, profile, state, repeat):
+    with tempfile.TemporaryDirectory(prefix="benchmark-tex-") as tmp:
+        if state == "warm":
+            run_isolated(case, profile, tmp)
+            return [run_isolated(case, profile, tmp) for _ in range(repeat)]
+        return [run_isolated(case, profile, Path(tmp) / f"run{index}") for index in range(repeat)]
+
+
+def run_suite(cases, profiles, repeat=3, states=TEX_CACHE_STATES):
+    results = {}
+    for case in cases:
+        for profile in profiles:
+            for state in states:
+                runs = run_cached(case, profile, state, repeat)
+                # Медиана по повторам сглаживает шум соседних процессов
+                result = {metric: statistics.median(run[metric] for run in runs)
+                          for metric in METRICS if runs[0][metric] is not None}
+                result["frames"] = runs[0]["frames"]
+                key = f"{case}/{profile}/{state}"
+                results[key] = result
+                print(f"{key}: {result['wall_seconds']:.2f} с, "
+                      f"{result['frames_per_second']:.1f} кадр/с", flush=True)
+    return results
+
+
+# === СРАВНЕНИЕ С БАЗОВОЙ ЛИНИЕЙ ===
+
+def compare(results, baseline, threshold):
+    regressions = []
+    lines = [f"{'сцена/профиль/кэш':<32} {'метрика':<18} {'база':>12} {'сейчас':>12} {'изм.':>8}"]
+    for key, result in sorted(results.items()):
+        if key not in baseline:
+            lines.append(f"{key:<32} нет в базовой линии")
+            continue
+        for metric, higher_is_worse in METRICS.items():
+            old, new = baseline[key].get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if higher_is_worse else change < -threshold
+            mark = "  РЕГРЕССИЯ" if worse else ""
+            lines.append(f"{key:<32} {metric:<18} {old:>12.2f} {new:>12.2f} {100 * change:>+7.1f}%{mark}")
+            if worse:
+                regressions.append((key, metric, change))
+    return regressions, "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк рендера сцен")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    case_parser = commands.add_parser("_case")
+    case_parser.add_argument("case", choices=CASES)
+    case_parser.add_argument("profile", choices=PROFILES)
+    case_parser.add_argument("cache_dir")
+
+    for name in ("run", "compare"):
+        sub = commands.add_parser(name)
+        sub.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+        sub.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=PROFILES)
+        sub.add_argument("--repeat", type=int, default=3)
+        sub.add_argument("--tex-cache", nargs="+", default=list(TEX_CACHE_STATES), choices=TEX_CACHE_STATES,
+                         help="состояние кэша LaTeX/Text: cold, warm или оба")
+        sub.add_argument("--baseline", default=str(BASELINE_FILE))
+    commands.choices["run"].add_argument("--save-baseline", action="store_true")
+    commands.choices["compare"].add_argument("--threshold", type=float, default=0.10,
+                                             help="допустимое относительное ухудшение (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.command == "_case":
+        print(json.dumps(run_case(args.case, args.profile, args.cache_dir)))
+        return
+
+    results = run_suite(args.cases, args.profiles, args.repeat, args.tex_cache)
+    baseline_path = Path(args.baseline)
+
+    if args.command == "run":
+        if args.save_baseline:
+            baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+            baseline.update(results)
+            baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+            print(f"Базовая линия сохранена в {baseline_path}")
+        return
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    regressions, table = compare(results, baseline, args.threshold)
+    print(table)
+    if regressions:
+        print(f"\nРегрессий: {len(regressions)} (порог {100 * args.threshold:.0f}%)")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Запуск:
+# python benchmark.py run --save-baseline        # записать базовую линию
+# python benchmark.py compare --threshold 0.1    # сравнить, код выхода 1 при регрессии
+# python benchmark.py compare --tex-cache warm   # только прогоны с прогретым кэшем LaTeX
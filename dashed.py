@@ -0,0 +1,45 @@
+import numpy as np
+from manim import VMobject
+
+
+def dash_points(vertices, num_dashes, dashed_ratio=0.5, closed=True):
+    # Штрихи ломаной одним массивом точек кубических кривых, без подобъектов.
+    # Каждый штрих - начало, все внутренние вершины ломаной (прижатые к его
+    # границам) и конец, поэтому у всех штрихов одинаковое число кривых:
+    # лишние вырождаются в точку, а углы внутри штриха сохраняются
+    if num_dashes < 1:
+        raise ValueError(f"Число штрихов должно быть не меньше 1, получено {num_dashes}")
+    vertices = np.asarray(vertices, dtype=float)
+    if closed:
+        vertices = np.vstack([vertices, vertices[:1]])
+    cumulative = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(vertices, axis=0), axis=1))])
+    if cumulative[-1] == 0:
+        raise ValueError("Ломаная нулевой длины")
+
+    period = cumulative[-1] / num_dashes
+    starts = np.arange(num_dashes) * period
+    ends = starts + dashed_ratio * period
+    inner = np.clip(cumulative[None, 1:-1], starts[:, None], ends[:, None])
+    stops = np.column_stack([starts, inner, ends])
+    anchors = np.stack([np.interp(stops, cumulative, vertices[:, k]) for k in range(3)], axis=-1)
+
+    # Отрезок как кубическая кривая: a, a + (b - a)/3, a + 2(b - a)/3, b
+    a, b = anchors[:, :-1], anchors[:, 1:]
+    curves = np.stack([a, a + (b - a) / 3, a + 2 * (b - a) / 3, b], axis=2)
+    return curves.reshape(-1, 3)
+
+
+class DashedPolyline(VMobject):
+    # Замена DashedVMobject(Polygon(...)) для пунктирных вспомогательных фигур:
+    # один мобджект с одним массивом точек вместо num_dashes подобъектов.
+    # Rotate/shift - одна операция над массивом, Transform между ломаными с тем
+    # же числом вершин и штрихов - без выравнивания точек
+    def __init__(self, *vertices, num_dashes=15, dashed_ratio=0.5, closed=True, **kwargs):
+        self.vertices = np.array(vertices, dtype=float)
+        self.num_dashes = num_dashes
+        self.dashed_ratio = dashed_ratio
+        self.closed = closed
+        super().__init__(**kwargs)
+
+    def generate_points(self):
+        self.points = dash_points(self.vertices, self.num_dashes, self.dashed_ratio, self.closed)
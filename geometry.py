@@ -0,0 +1,65 @@
+import numpy as np
+
+# Пакетная геометрия для сцен: на вход массивы точек (N, 3) или одна точка (3,),
+# форма результата повторяет форму входа
+
+
+def as_points(points):
+    points = np.asarray(points, dtype=float)
+    return points.reshape(-1, 3), points.shape
+
+
+def rotate_points(points, center, angle):
+    # Поворот в плоскости XY вокруг center; angle - скаляр или массив (N,)
+    flat, shape = as_points(points)
+    center = np.asarray(center, dtype=float)
+    angle = np.asarray(angle, dtype=float)
+    cos, sin = np.cos(angle), np.sin(angle)
+    offset = flat - center
+    rotated = flat.copy()
+    rotated[:, 0] = center[0] + offset[:, 0] * cos - offset[:, 1] * sin
+    rotated[:, 1] = center[1] + offset[:, 0] * sin + offset[:, 1] * cos
+    rotated[:, 2] = center[2]
+    return rotated.reshape(shape)
+
+
+def ray_angles(vertices, points):
+    # Полярный угол луча vertex -> point
+    offset = np.asarray(points, dtype=float) - np.asarray(vertices, dtype=float)
+    return np.arctan2(offset[..., 1], offset[..., 0])
+
+
+def arc_angles(vertices, starts, ends):
+    # Дуга угла от луча vertex -> start к лучу vertex -> end:
+    # (start_angle, angle) в том виде, как их ждет Arc
+    start_angles = ray_angles(vertices, starts)
+    return start_angles, ray_angles(vertices, ends) - start_angles
+
+
+def points_on_circle(centers, radius, angles):
+    centers = np.asarray(centers, dtype=float)
+    angles = np.asarray(angles, dtype=float)
+    radius = np.asarray(radius, dtype=float)
+    offset = np.stack([np.cos(angles), np.sin(angles), np.zeros_like(angles)], axis=-1)
+    return centers + radius[..., None] * offset
+
+
+def bisector_points(vertices, radius, start_angles, sweeps):
+    # Позиция подписи угла: на биссектрисе, на расстоянии radius от вершины
+    start_angles = np.asarray(start_angles, dtype=float)
+    return points_on_circle(vertices, radius, start_angles + np.asarray(sweeps) / 2)
+
+
+def tick_marks(starts, ends, half_length=0.15):
+    # Риски равенства отрезков: поперек середины каждого отрезка.
+    # Результат (..., 2, 3) - концы риски
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    direction = ends - starts
+    length = np.linalg.norm(direction, axis=-1, keepdims=True)
+    direction = np.divide(direction, length, out=np.zeros_like(direction), where=length > 0)
+    perpendicular = np.stack(
+        [-direction[..., 1], direction[..., 0], np.zeros_like(direction[..., 0])], axis=-1
+    ) * half_length
+    midpoints = (starts + ends) / 2
+    return np.stack([midpoints + perpendicular, midpoints - perpendicular], axis=-2)
@@ -0,0 +1,116 @@
+import weakref
+from collections import Counter, OrderedDict
+from itertools import groupby
+
+import numpy as np
+from manim import logger
+from manim.mobject.text.tex_mobject import MathTex
+from manim.mobject.text.text_mobject import Text
+
+from static_layers import composite, crop_layer, layer_key
+
+# Битмап подписи растеризуется, когда ее состояние встретилось второй раз
+BITMAP_CACHE_SIZE = 256
+SEEN_LIMIT = 4096
+
+
+# === ПОДПИСИ ===
+
+# Разбор SVG одинаковых подписей manim и так кэширует (SVG_HASH_TO_MOB_MAP),
+# здесь подпись только регистрируется для битмапов glyph_bitmaps
+
+def text(string, **kwargs):
+    return register_label(Text(string, **kwargs))
+
+
+def tex(*strings, **kwargs):
+    return register_label(MathTex(*strings, **kwargs))
+
+
+# === БИТМАПЫ ПОДПИСЕЙ ===
+
+# Член семейства подписи -> слабая ссылка на корень подписи
+_label_of = weakref.WeakKeyDictionary()
+
+
+def register_label(label):
+    root = weakref.ref(label)
+    for member in label.get_family():
+        _label_of[member] = root
+    return label
+
+
+class GlyphBitmapMixin:
+    # Подпись, которая от кадра к кадру не меняется, рисуется копированием
+    # готового битмапа вместо обхода кривых Безье в cairo
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.glyph_bitmaps = OrderedDict()
+        self.glyph_seen = set()
+        self.glyph_scratch = None
+        self.glyph_stats = Counter()
+        self.camera.display_multiple_non_background_colored_vmobjects = self.draw_vmobjects
+
+    def draw_vmobjects(self, vmobjects, pixel_array):
+        camera = self.camera
+        ctx = camera.get_cairo_context(pixel_array)
+        for root, group in groupby(vmobjects, key=_label_of.get):
+            group = list(group)
+            layer = self.label_bitmap(root(), group) if root is not None else None
+            if layer is None:
+                for vmobject in group:
+                    camera.display_vectorized(vmobject, ctx)
+                continue
+            if layer is False:
+                continue
+            surface = ctx.get_target()
+            surface.flush()
+            composite(pixel_array, layer)
+            surface.mark_dirty()
+
+    def label_bitmap(self, label, group):
+        # Только вся подпись целиком и в своем порядке отрисовки
+        if label is None or group != label.family_members_with_points():
+            return None
+        key = layer_key(self.camera, group)
+        if key is None:
+            return None
+        if key in self.glyph_bitmaps:
+            self.glyph_bitmaps.move_to_end(key)
+            self.glyph_stats["hits"] += 1
+            return self.glyph_bitmaps[key]
+        if key not in self.glyph_seen:
+            # Разовые состояния (подпись в движении) не растеризуем
+            if len(self.glyph_seen) > SEEN_LIMIT:
+                self.glyph_seen.clear()
+            self.glyph_seen.add(key)
+            return None
+
+        self.glyph_stats["misses"] += 1
+        layer = self.rasterize_label(group)
+        # Пустая подпись (прозрачная) - запоминаем как False, рисовать нечего
+        self.glyph_bitmaps[key] = layer if layer is not None else False
+        while len(self.glyph_bitmaps) > BITMAP_CACHE_SIZE:
+            self.glyph_bitmaps.popitem(last=False)
+        return self.glyph_bitmaps[key]
+
+    def rasterize_label(self, group):
+        camera = self.camera
+        if self.glyph_scratch is None or self.glyph_scratch.shape != camera.pixel_array.shape:
+            self.glyph_scratch = np.zeros_like(camera.pixel_array)
+        scratch = self.glyph_scratch
+        ctx = camera.get_cairo_context(scratch)
+        surface = ctx.get_target()
+        surface.flush()
+        scratch[...] = 0
+        surface.mark_dirty()
+        for vmobject in group:
+            camera.display_vectorized(vmobject, ctx)
+        surface.flush()
+        return crop_layer(scratch)
+
+    def scene_finished(self, scene):
+        super().scene_finished(scene)
+        if self.glyph_stats:
+            logger.info(f"glyph_bitmaps: подписей из битмапов {self.glyph_stats['hits']}, "
+                        f"растеризовано {self.glyph_stats['misses']}")
@@ -0,0 +1,122 @@
+import functools
+import hashlib
+from fractions import Fraction
+from pathlib import Path
+
+import av
+import numpy as np
+from manim import config
+from manim.scene.scene_file_writer import SceneFileWriter, to_av_frame_rate
+from manim.utils.file_ops import write_to_movie
+
+# Короче этого держать кадр нет смысла: обычное кодирование не дороже
+MIN_HELD_FRAMES = 3
+
+
+@functools.lru_cache(maxsize=None)
+def held_frame_writer(base):
+    class HeldFrameFileWriter(base):
+        # Статичные wait() не кодируются покадрово: кадр пишется дважды
+        # (pts = 0 и pts = N-1), и плеер держит его всю длительность.
+        # Подряд идущие wait() с одинаковым кадром сливаются в один файл.
+        def __init__(self, *args, **kwargs):
+            self.holding = False
+            self.held = None
+            self.encoding_held = False
+            super().__init__(*args, **kwargs)
+
+        def begin_animation(self, allow_write=False, file_path=None):
+            scene = getattr(self.renderer, "playing_scene", None)
+            self.holding = bool(
+                allow_write and write_to_movie() and file_path is None
+                and scene is not None and scene.is_current_animation_frozen_frame()
+            )
+            if self.holding:
+                return
+            self.flush_held_frames()
+            super().begin_animation(allow_write, file_path)
+
+        def end_animation(self, allow_write=False):
+            if self.holding:
+                self.holding = False
+                return
+            super().end_animation(allow_write)
+
+        def write_frame(self, frame, num_frames=1):
+            if not self.holding:
+                return super().write_frame(frame, num_frames)
+
+            index = self.renderer.num_plays
+            held = self.held
+            if held is not None and held["section"] is self.sections[-1] and np.array_equal(held["frame"], frame):
+                held["num_frames"] += num_frames
+                held["plays"].append(index)
+                return
+            self.flush_held_frames()
+            self.held = {"frame": frame, "num_frames": num_frames, "plays": [index], "section": self.sections[-1]}
+
+        def flush_held_frames(self):
+            held, self.held = self.held, None
+            if held is None:
+                return
+
+            paths = [self.partial_movie_files[index] for index in held["plays"]]
+            if len(paths) == 1:
+                path = paths[0]
+            else:
+                names = "|".join(Path(path).stem for path in paths)
+                digest = hashlib.sha256(names.encode()).hexdigest()[:16]
+                path = str(self.partial_movie_directory / f"held_{digest}{config['movie_file_extension']}")
+                # Слитый сегмент занимает место первого wait(), остальные пропускаются
+                for index in held["plays"]:
+                    self.partial_movie_files[index] = None
+                self.partial_movie_files[held["plays"][0]] = path
+                section_files = held["section"].partial_movie_files
+                for i, section_path in enumerate(section_files):
+                    if section_path in paths:
+                        section_files[i] = path if section_path == paths[0] else None
+
+            if Path(path).exists():
+                return
+            self.open_partial_movie_stream(file_path=path)
+            self.encoding_held = True
+            try:
+                self.queue.put((held["num_frames"], held["frame"]))
+            finally:
+                self.close_partial_movie_stream()
+                self.encoding_held = False
+
+        def encode_and_write_frame(self, frame, num_frames):
+            if not self.encoding_held or num_frames < MIN_HELD_FRAMES:
+                return super().encode_and_write_frame(frame, num_frames)
+            time_base = Fraction(1) / to_av_frame_rate(config.frame_rate)
+            for pts in (0, num_frames - 1):
+                av_frame = av.VideoFrame.from_ndarray(frame, format="rgba")
+                av_frame.pts = pts
+                av_frame.time_base = time_base
+                for packet in self.video_stream.encode(av_frame):
+                    self.video_container.mux(packet)
+
+        def next_section(self, *args, **kwargs):
+            self.flush_held_frames()
+            super().next_section(*args, **kwargs)
+
+        def finish(self):
+            self.flush_held_frames()
+            super().finish()
+
+    return HeldFrameFileWriter
+
+
+class HeldFrameMixin:
+    def __init__(self, *args, **kwargs):
+        kwargs["file_writer_class"] = held_frame_writer(kwargs.get("file_writer_class", SceneFileWriter))
+        super().__init__(*args, **kwargs)
+        self.playing_scene = None
+
+    def play(self, scene, *args, **kwargs):
+        self.playing_scene = scene
+        try:
+            super().play(scene, *args, **kwargs)
+        finally:
+            self.playing_scene = None
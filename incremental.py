@@ -0,0 +1,268 @@
+import argparse
+import ast
+import functools
+import hashlib
+import json
+import types
+from pathlib import Path
+
+import numpy as np
+from manim import config, logger
+from manim.animation.animation import Animation
+from manim.mobject.mobject import Mobject
+from manim.renderer import cairo_renderer
+from manim.utils.color import ManimColor
+from manim.utils.family import extract_mobject_family_members
+from manim.utils.iterables import list_update
+
+from static_layers import STYLE_ARRAYS, STYLE_VALUES
+
+MANIFEST_PREFIX = "manifest_"
+# Поля анимации, не влияющие на картинку
+IGNORED_ANIMATION_FIELDS = {"name", "suspend_mobject_updating", "introducer", "remover"}
+
+_original_hash = cairo_renderer.get_hash_from_play_call
+
+
+# === КЛЮЧ СЕГМЕНТА ===
+
+def visited(hasher, value, seen):
+    # seen: id -> (номер, объект). Повторная встреча пишет номер первой: апдейтер,
+    # замкнутый на свой мобджект, и циклы не уводят в бесконечную рекурсию, а
+    # ссылки на разные объекты остаются различимы. Объект держится в seen,
+    # чтобы его id не достался временному объекту
+    entry = seen.get(id(value))
+    if entry is not None:
+        hasher.update(f"ref{entry[0]}".encode())
+        return True
+    seen[id(value)] = (len(seen), value)
+    return False
+
+
+def update_mobject_state(hasher, mobject, seen):
+    # Только то, что видит камера: геометрия и стиль всех членов семейства
+    for member in extract_mobject_family_members([mobject]):
+        if visited(hasher, member, seen):
+            continue
+        hasher.update(type(member).__name__.encode())
+        for name in STYLE_ARRAYS:
+            hasher.update(np.ascontiguousarray(getattr(member, name, ())).tobytes())
+        hasher.update(repr([getattr(member, name, None) for name in STYLE_VALUES]).encode())
+        pixel_array = getattr(member, "pixel_array", None)
+        if pixel_array is not None:
+            hasher.update(np.ascontiguousarray(pixel_array).tobytes())
+        # Апдейтеры меняют кадры внутри сегмента - учитываем их код
+        for updater in getattr(member, "updaters", ()):
+            update_callable(hasher, updater, seen)
+
+
+def update_code(hasher, code):
+    hasher.update(code.co_code)
+    hasher.update(repr(code.co_names).encode())
+    # Вложенные функции - по их коду: repr(code) содержит адрес и меняется между запусками
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            update_code(hasher, const)
+        else:
+            hasher.update(repr(const).encode())
+
+
+def update_callable(hasher, func, seen):
+    # Как и в хеше manim, учитываются не только байткод, но и захваченные
+    # значения: замыкания, значения по умолчанию, self связанного метода
+    hasher.update(getattr(func, "__qualname__", type(func).__name__).encode())
+    if isinstance(func, functools.partial):
+        update_value(hasher, (func.func, func.args, func.keywords), seen)
+        return
+    code = getattr(func, "__code__", None)
+    if code is not None:
+        update_code(hasher, code)
+    update_value(hasher, getattr(func, "__defaults__", None), seen)
+    update_value(hasher, getattr(func, "__kwdefaults__", None), seen)
+    for cell in getattr(func, "__closure__", None) or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:
+            hasher.update(b"empty")
+            continue
+        update_value(hasher, contents, seen)
+    bound = getattr(func, "__self__", None)
+    if bound is not None and not isinstance(bound, types.ModuleType):
+        # self встроенной функции - модуль, его состояние к кадрам не относится
+        hasher.update(b"self")
+        update_value(hasher, bound, seen)
+
+
+def update_value(hasher, value, seen):
+    if isinstance(value, (int, float, str, bool, type(None))):
+        hasher.update(repr(value).encode())
+        return
+    if isinstance(value, Mobject):
+        update_mobject_state(hasher, value, seen)
+        return
+    if visited(hasher, value, seen):
+        return
+    if isinstance(value, Animation):
+        update_animation(hasher, value, seen)
+    elif isinstance(value, np.ndarray):
+        hasher.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, ManimColor):
+        hasher.update(value.to_hex(with_alpha=True).encode())
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"seq{len(value)}".encode())
+        for item in value:
+            update_value(hasher, item, seen)
+    elif isinstance(value, dict):
+        hasher.update(f"dict{len(value)}".encode())
+        for key, item in sorted(value.items(), key=lambda pair: repr(pair[0])):
+            hasher.update(repr(key).encode())
+            update_value(hasher, item, seen)
+    elif callable(value):
+        update_callable(hasher, value, seen)
+    else:
+        hasher.update(type(value).__name__.encode())
+
+
+def update_animation(hasher, animation, seen):
+    hasher.update(type(animation).__name__.encode())
+    for name, value in sorted(vars(animation).items()):
+        if name in IGNORED_ANIMATION_FIELDS:
+            continue
+        hasher.update(name.encode())
+        update_value(hasher, value, seen)
+
+
+def dependency_key(scene, camera, animations, mobjects):
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr((
+        camera.pixel_width, camera.pixel_height, camera.frame_width, camera.frame_height,
+        tuple(camera.frame_center), config.frame_rate,
+    )).encode())
+    hasher.update(camera.background.tobytes())
+    seen = {}
+    for mobject in list_update(scene.mobjects, scene.foreground_mobjects):
+        update_mobject_state(hasher, mobject, seen)
+    for animation in animations:
+        update_animation(hasher, animation, seen)
+    return f"dep_{hasher.hexdigest()}"
+
+
+def get_hash_from_play_call(scene, camera, animations, mobjects):
+    if isinstance(scene.renderer, IncrementalMixin):
+        return dependency_key(scene, camera, animations, mobjects)
+    return _original_hash(scene, camera, animations, mobjects)
+
+
+cairo_renderer.get_hash_from_play_call = get_hash_from_play_call
+
+
+# === РЕНДЕРЕР ===
+
+class IncrementalMixin:
+    # Ключ сегмента - только состояние видимых мобджектов и параметры анимаций,
+    # а не полный __dict__ сцены, как в manim; отчет о переиспользовании
+    # пишется в manifest_<имя>.json рядом с частичными файлами
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.segment_report = []
+
+    def play(self, scene, *args, **kwargs):
+        super().play(scene, *args, **kwargs)
+        key = self.animations_hashes[-1]
+        if key is None:
+            status = "skipped"
+        elif self.skip_animations:
+            status = "reused"
+        else:
+            status = "rendered"
+        self.segment_report.append({"index": self.num_plays - 1, "key": key, "status": status})
+
+    def scene_finished(self, scene):
+        super().scene_finished(scene)
+        writer = self.file_writer
+        if not hasattr(writer, "partial_movie_directory") or not self.segment_report:
+            return
+        files = [Path(path).name for path in writer.partial_movie_files if path is not None]
+        directory = writer.partial_movie_directory
+        manifest_path = directory / f"{MANIFEST_PREFIX}{Path(writer.output_name).stem}.json"
+        # recorded - все сегменты, которые этот рендер когда-либо писал (и еще
+        # лежат на диске): сборка мусора удаляет только их, чужие файлы не трогает
+        recorded = set(files)
+        if manifest_path.exists():
+            previous = json.loads(manifest_path.read_text(encoding="utf-8"))
+            recorded.update(name for name in previous.get("recorded", previous["files"])
+                            if (directory / name).exists())
+        manifest = {"output": str(writer.output_name), "files": files, "recorded": sorted(recorded),
+                    "segments": self.segment_report}
+        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        reused = sum(item["status"] == "reused" for item in self.segment_report)
+        rendered = sum(item["status"] == "rendered" for item in self.segment_report)
+        logger.info(f"incremental: переиспользовано {reused}, отрендерено {rendered} сегментов")
+
+
+# === СБОРКА МУСОРА В partial_movie_files ===
+
+def defined_scenes(file):
+    tree = ast.parse(Path(file).read_text(encoding="utf-8"))
+    return {node.name for node in tree.body if isinstance(node, ast.ClassDef)}
+
+
+def collect_garbage(media_dir, scene_files, dry_run=False):
+    # media/videos/<модуль>/<качество>/partial_movie_files/<сцена>
+    modules = {Path(file).stem: defined_scenes(file) for file in scene_files}
+    removed, reclaimed = [], 0
+    for directory in sorted(Path(media_dir).glob("videos/*/*/partial_movie_files/*")):
+        module = directory.parents[2].name
+        if not directory.is_dir() or module not in modules:
+            continue
+        scenes = modules[module]
+        manifests = list(directory.glob(f"{MANIFEST_PREFIX}*.json"))
+        if directory.name not in scenes:
+            # Сцены больше нет в исходниках - удаляем все ее сегменты
+            victims = [path for path in directory.iterdir() if path.is_file()]
+        elif manifests:
+            # Удаляются только сегменты, которые записал прошлый инкрементальный
+            # рендер и не использует ни один текущий манифест; файлы обычных
+            # рендеров manim манифесты не знают - их не трогаем
+            keep, recorded = set(), set()
+            for manifest in manifests:
+                data = json.loads(manifest.read_text(encoding="utf-8"))
+                keep.update(data["files"])
+                recorded.update(data.get("recorded", ()))
+            victims = [directory / name for name in sorted(recorded - keep) if (directory / name).is_file()]
+        else:
+            # Без манифеста нельзя сказать, какие файлы нужны
+            continue
+        for path in victims:
+            reclaimed += path.stat().st_size
+            removed.append(path)
+            if not dry_run:
+                path.unlink()
+        if not dry_run and directory.name not in scenes and not any(directory.iterdir()):
+            directory.rmdir()
+    return removed, reclaimed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сборка мусора в partial_movie_files")
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument("--media-dir", default="media")
+    parser.add_argument("--scenes", nargs="+", default=["main.py"], help="файлы с актуальными сценами")
+    parser.add_argument("--dry-run", action="store_true", help="только показать, что будет удалено")
+    args = parser.parse_args()
+
+    removed, reclaimed = collect_garbage(args.media_dir, args.scenes, args.dry_run)
+    for path in removed:
+        print(path)
+    action = "будет удалено" if args.dry_run else "удалено"
+    print(f"{action}: {len(removed)} файлов, {reclaimed / (1024 * 1024):.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Сборка мусора (сначала посмотреть, что удалится):
+# python incremental.py gc --dry-run
+# python incremental.py gc
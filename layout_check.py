@@ -0,0 +1,192 @@
+import argparse
+import inspect
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from manim import PI, tempconfig
+from manim.mobject.geometry.arc import AnnularSector, Arc, Circle
+from manim.mobject.text.tex_mobject import SingleStringMathTex
+from manim.mobject.text.text_mobject import MarkupText, Text
+
+from segment_render import TimelineRenderer, load_scene_class, render_options
+
+MAIN_FILE = Path(__file__).with_name("main.py")
+TEXT_TYPES = (Text, MarkupText, SingleStringMathTex)
+
+# Допуски в единицах сцены: касание рамок - еще не пересечение
+FRAME_MARGIN = 1e-3
+OVERLAP_AREA = 1e-3
+MIN_ARC_SWEEP = 1e-3
+
+
+# === ГЕОМЕТРИЯ КАДРА ===
+
+def is_visible(mob):
+    for member in mob.family_members_with_points():
+        if len(member.fill_rgbas) and member.fill_rgbas[:, 3].max() > 0:
+            return True
+        if member.stroke_width > 0 and len(member.stroke_rgbas) and member.stroke_rgbas[:, 3].max() > 0:
+            return True
+    return False
+
+
+def bounding_box(mob):
+    # По опорным точкам кривых: быстрее get_critical_point и достаточно для проверки
+    points = [member.points for member in mob.family_members_with_points()]
+    if not points:
+        return None
+    points = np.vstack(points)
+    return points[:, :2].min(axis=0), points[:, :2].max(axis=0)
+
+
+def overlap_area(box_a, box_b):
+    low = np.maximum(box_a[0], box_b[0])
+    high = np.minimum(box_a[1], box_b[1])
+    size = np.clip(high - low, 0, None)
+    return float(size[0] * size[1])
+
+
+def text_leaves(mob):
+    # Текстовые объекты внутри групп (условие, ответ с рамкой), без их глифов
+    if isinstance(mob, TEXT_TYPES):
+        return [mob]
+    return [leaf for sub in mob.submobjects for leaf in text_leaves(sub)]
+
+
+def construct_names():
+    # Имена переменных из construct: в отчете "answer_text", а не "MathTex"
+    frame = inspect.currentframe()
+    while frame is not None and frame.f_code.co_name != "construct":
+        frame = frame.f_back
+    if frame is None:
+        return {}
+    return {id(value): name for name, value in frame.f_locals.items() if not name.startswith("_")}
+
+
+def describe(mob, names):
+    if id(mob) in names:
+        return names[id(mob)]
+    text = getattr(mob, "tex_string", None) or getattr(mob, "text", None)
+    return f"{type(mob).__name__}({text!r})" if text else type(mob).__name__
+
+
+# === ПРОВЕРКИ ===
+
+def check_scene(scene, names):
+    camera = scene.renderer.camera
+    center = np.asarray(camera.frame_center)[:2]
+    half = np.array([camera.frame_width, camera.frame_height]) / 2
+    frame_low, frame_high = center - half - FRAME_MARGIN, center + half + FRAME_MARGIN
+
+    issues = []
+    visible = [mob for mob in scene.mobjects if is_visible(mob)]
+    for mob in visible:
+        box = bounding_box(mob)
+        if box is not None and (np.any(box[0] < frame_low) or np.any(box[1] > frame_high)):
+            issues.append(("off_frame", (describe(mob, names),),
+                           f"рамка {np.round(box[0], 2).tolist()}..{np.round(box[1], 2).tolist()}"))
+        for arc in mob.get_family():
+            # Дуги углов; окружности и секторы могут быть больше 180° законно
+            if isinstance(arc, Arc) and not isinstance(arc, (Circle, AnnularSector)):
+                sweep = abs(arc.angle)
+                if sweep < MIN_ARC_SWEEP or sweep > PI:
+                    issues.append(("arc_sweep", (describe(arc, names),), f"угол {np.degrees(arc.angle):.1f}°"))
+
+    texts = [leaf for mob in visible for leaf in text_leaves(mob) if is_visible(leaf)]
+    boxes = [bounding_box(text) for text in texts]
+    for i in range(len(texts)):
+        for j in range(i + 1, len(texts)):
+            if boxes[i] is None or boxes[j] is None:
+                continue
+            area = overlap_area(boxes[i], boxes[j])
+            if area > OVERLAP_AREA:
+                pair = tuple(sorted((describe(texts[i], names), describe(texts[j], names))))
+                issues.append(("overlap", pair, f"площадь пересечения {area:.3f}"))
+    return issues
+
+
+class LayoutRenderer(TimelineRenderer):
+    # Проигрывает сцену без растеризации и кодирования; после каждой
+    # анимации проверяет итоговые рамки объектов
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.issues = []
+        self.seen = set()
+
+    def play(self, scene, *args, **kwargs):
+        super().play(scene, *args, **kwargs)
+        index = self.timeline[-1]["index"]
+        for kind, objects, detail in check_scene(scene, construct_names()):
+            # Одна и та же проблема отмечается в первой анимации, где появилась
+            if (kind, objects) in self.seen:
+                continue
+            self.seen.add((kind, objects))
+            self.issues.append({"kind": kind, "animation": index, "objects": list(objects), "detail": detail})
+
+
+# === ЗАПУСК ===
+
+def check_variants(file_path, scene_name, variants):
+    # variants: список (имя, params или None); модуль сцены грузится один раз
+    options = {**render_options(file_path), "dry_run": True}
+    results = []
+    with tempconfig(options):
+        scene_class = load_scene_class(file_path, scene_name)
+        for name, params in variants:
+            start = time.perf_counter()
+            renderer = LayoutRenderer()
+            scene_kwargs = {} if params is None else {"params": params}
+            scene_class(renderer=renderer, **scene_kwargs).render()
+            results.append({
+                "name": name,
+                "params": params,
+                "issues": renderer.issues,
+                "milliseconds": 1000 * (time.perf_counter() - start),
+            })
+    return results
+
+
+def print_report(results):
+    for result in results:
+        status = "OK" if not result["issues"] else f"проблем: {len(result['issues'])}"
+        print(f"{result['name']}: {status} ({result['milliseconds']:.0f} мс)")
+        for issue in result["issues"]:
+            print(f"  #{issue['animation']:<3d} {issue['kind']:<10} {', '.join(issue['objects'])}: {issue['detail']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка раскладки сцены без рендера")
+    parser.add_argument("file", nargs="?", default=str(MAIN_FILE))
+    parser.add_argument("scene", nargs="?", default="GeometryProblem")
+    parser.add_argument("--params", default=None, help='JSON с параметрами, например \'{"e_ratio": 0.3}\'')
+    parser.add_argument("--jobs", default=None, help="CSV/JSON с вариантами, как для batch_render.py")
+    parser.add_argument("--json", default=None, help="сохранить отчет в JSON")
+    args = parser.parse_args()
+
+    if args.jobs:
+        from batch_render import load_jobs
+
+        variants = [(job["name"], job["params"]) for job in load_jobs(args.jobs)]
+    else:
+        params = json.loads(args.params) if args.params else None
+        variants = [(args.scene, params)]
+
+    results = check_variants(args.file, args.scene, variants)
+    print_report(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    if any(result["issues"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Запуск:
+# python layout_check.py                                  # GeometryProblem с параметрами по умолчанию
+# python layout_check.py --params '{"e_ratio": 0.9}'
+# python layout_check.py --jobs jobs.csv --json layout.json   # код выхода 1, если есть проблемы
@@ -1,19 +1,57 @@
 from manim import *
 import numpy as np
 
+from batched_style import BatchedStyle
+from dashed import DashedPolyline
+import geometry
+import glyph_atlas
+import render_modes
+import tex_cache
+
 config.frame_rate = 60
 
+# Общий кэш LaTeX/Text между запусками (настройки в manim.cfg, секция [tex_cache])
+tex_cache.install()
+
+# Параметры задачи по умолчанию
+PROBLEM_DEFAULTS = {
+    "side_length": 5.0,  # сторона квадрата на чертеже
+    "e_ratio": 0.4,      # E на BC: доля пути от B к C
+    "f_ratio": 0.6,      # F на DC: доля пути от D к C
+    "ef_length": 17,     # длина EF в условии
+    "area": 170,         # площадь треугольника AEF в условии
+}
+
+
+def format_number(value):
+    return f"{value:g}"
+
+
 class GeometryProblem(Scene):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, params=None, **kwargs):
+        # Режимы рендера из manim.cfg (секция [render_modes]), если рендерер не задан явно
+        if kwargs.get("renderer") is None and config.renderer == RendererType.CAIRO:
+            kwargs["renderer"] = render_modes.make_renderer(skip_animations=kwargs.get("skip_animations", False))
+        super().__init__(**kwargs)
         self.camera.frame_width = 24.5
         self.camera.frame_height = 14
 
+        params = dict(params or {})
+        unknown = set(params) - set(PROBLEM_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры задачи: {', '.join(sorted(unknown))}")
+        self.params = {**PROBLEM_DEFAULTS, **params}
+
     def construct(self):
         self.camera.background_color = BLACK
         
+        # Условие задачи: AD = 2 * S / EF
+        ef_length = format_number(self.params["ef_length"])
+        area = format_number(self.params["area"])
+        answer = format_number(2 * self.params["area"] / self.params["ef_length"])
+
         # Создаем квадрат ABCD
-        side_length = 5.0
+        side_length = self.params["side_length"]
         A = np.array([-side_length/2, side_length/2, 0])
         B = np.array([side_length/2, side_length/2, 0])
         C = np.array([side_length/2, -side_length/2, 0])
@@ -23,8 +61,16 @@ class GeometryProblem(Scene):
         square = Polygon(A, B, C, D, color=BLUE, stroke_width=4)
         
         # Добавляем точки F на DC и E на BC
-        F_pos = D + 0.6 * (C - D)  # F находится на 60% от D к C
-        E_pos = B + 0.4 * (C - B)  # E находится на 40% от B к C
+        F_pos = D + self.params["f_ratio"] * (C - D)  # F на DC
+        E_pos = B + self.params["e_ratio"] * (C - B)  # E на BC
+
+        # Положения B и E после поворота вокруг A на 90° по часовой стрелке
+        B_rotated, E_rotated = geometry.rotate_points([B, E_pos], A, -PI/2)
+
+        # Дуги углов при вершине A (EAF, DAF, EAB, E'AD) и подписи на их биссектрисах
+        arc_radii = np.array([0.8, 1.4, 1.4, 1.4])
+        arc_starts, arc_sweeps = geometry.arc_angles(A, [E_pos, D, B, D], [F_pos, F_pos, E_pos, E_rotated])
+        arc_label_positions = geometry.bisector_points(A, arc_radii + 0.3, arc_starts, arc_sweeps)
         
         # Создаем отрезки из A в E и A в F
         AE = Line(A, E_pos, color=WHITE, stroke_width=4)
@@ -48,12 +94,12 @@ class GeometryProblem(Scene):
         dot_F = Dot(F_pos, color=WHITE, radius=0.08)
         
         # Подписи точек
-        label_A = Text("A", font_size=24, color=WHITE).next_to(A, UP + LEFT, buff=0.15)
-        label_B = Text("B", font_size=24, color=WHITE).next_to(B, UP + RIGHT, buff=0.15)
-        label_C = Text("C", font_size=24, color=WHITE).next_to(C, DOWN + RIGHT, buff=0.15)
-        label_D = Text("D", font_size=24, color=WHITE).next_to(D, DOWN + LEFT, buff=0.15)
-        label_E = Text("E", font_size=24, color=WHITE).next_to(E_pos, RIGHT, buff=0.15)
-        label_F = Text("F", font_size=24, color=WHITE).next_to(F_pos, DOWN, buff=0.15)
+        label_A = glyph_atlas.text("A", font_size=24, color=WHITE).next_to(A, UP + LEFT, buff=0.15)
+        label_B = glyph_atlas.text("B", font_size=24, color=WHITE).next_to(B, UP + RIGHT, buff=0.15)
+        label_C = glyph_atlas.text("C", font_size=24, color=WHITE).next_to(C, DOWN + RIGHT, buff=0.15)
+        label_D = glyph_atlas.text("D", font_size=24, color=WHITE).next_to(D, DOWN + LEFT, buff=0.15)
+        label_E = glyph_atlas.text("E", font_size=24, color=WHITE).next_to(E_pos, RIGHT, buff=0.15)
+        label_F = glyph_atlas.text("F", font_size=24, color=WHITE).next_to(F_pos, DOWN, buff=0.15)
         
         # === ПОСТРОЕНИЕ ГЕОМЕТРИИ ===
         self.play(Create(square))
@@ -81,18 +127,10 @@ class GeometryProblem(Scene):
         self.wait(2)
         
         # Показываем угол EAF = 45° - ПРАВИЛЬНАЯ ДУГА
-        angle_radius = 0.8
-        # Вычисляем углы для лучей AE и AF
-        vector_AE = E_pos - A
-        vector_AF = F_pos - A
-        angle_AE = np.arctan2(vector_AE[1], vector_AE[0])
-        angle_AF = np.arctan2(vector_AF[1], vector_AF[0])
-        
-        # Создаем правильную дугу угла
         angle_EAF = Arc(
-            radius=angle_radius,
-            start_angle=angle_AE,
-            angle=angle_AF - angle_AE,
+            radius=arc_radii[0],
+            start_angle=arc_starts[0],
+            angle=arc_sweeps[0],
             color=YELLOW,
             stroke_width=4
         ).move_arc_center_to(A)
@@ -103,18 +141,17 @@ class GeometryProblem(Scene):
         
         # === ЧИСЛЕННЫЕ ЗНАЧЕНИЯ ===
         
-        # Длина EF = 17 (зеленый)
-        EF_label = MathTex("17", font_size=24, color=WHITE)
+        # Длина EF (зеленый)
+        EF_label = MathTex(ef_length, font_size=24, color=WHITE)
         EF_label.next_to(EF.get_center(), DOWN+RIGHT)
         
         # Угол 45° (желтый)
-        angle_label = MathTex("45^\\circ", font_size=24, color=YELLOW)
+        angle_label = glyph_atlas.tex("45^\\circ", font_size=24, color=YELLOW)
         # Размещаем метку угла на дуге
-        mid_angle = (angle_AE + angle_AF) / 2
-        angle_label.move_to(A + (angle_radius + 0.3) * np.array([np.cos(mid_angle), np.sin(mid_angle), 0]))
+        angle_label.move_to(arc_label_positions[0])
         
-        # Площадь треугольника AEF = 170 (красный)
-        area_label = MathTex("170", font_size=32, color=WHITE)
+        # Площадь треугольника AEF (красный)
+        area_label = MathTex(area, font_size=32, color=WHITE)
         area_label.move_to(triangle_AEF.get_center(), LEFT+UP)
         
         self.play(
@@ -128,8 +165,8 @@ class GeometryProblem(Scene):
         # === УСЛОВИЕ ЗАДАЧИ СПРАВА ===
         conditions_text = VGroup(
             MathTex("\\angle FAE=45^\\circ"),
-            MathTex("S_{\\triangle FAE}=170"), 
-            MathTex("FE=17"),
+            MathTex(f"S_{{\\triangle FAE}}={area}"), 
+            MathTex(f"FE={ef_length}"),
             MathTex("AD-?", color = RED)
         ).arrange(DOWN, aligned_edge=LEFT, buff=0.3)
 
@@ -150,42 +187,28 @@ class GeometryProblem(Scene):
         # === ДОПОЛНИТЕЛЬНЫЕ УГЛЫ ===
         
         # Угол DAF (α) - оранжевый
-        angle_DAF_radius = 1.4
-        vector_AD = D - A
-        vector_AF_2 = F_pos - A
-        angle_AD = np.arctan2(vector_AD[1], vector_AD[0])
-        angle_AF_2 = np.arctan2(vector_AF_2[1], vector_AF_2[0])
-        
         angle_DAF = Arc(
-            radius=angle_DAF_radius,
-            start_angle=angle_AD,
-            angle=angle_AF_2 - angle_AD,
+            radius=arc_radii[1],
+            start_angle=arc_starts[1],
+            angle=arc_sweeps[1],
             color=ORANGE,
             stroke_width=4
         ).move_arc_center_to(A)
         
-        alpha_label = MathTex("\\alpha", font_size=36, color=ORANGE)
-        alpha_mid_angle = (angle_AD + angle_AF_2) / 2
-        alpha_label.move_to(A + (angle_DAF_radius + 0.3) * np.array([np.cos(alpha_mid_angle), np.sin(alpha_mid_angle), 0]))
+        alpha_label = glyph_atlas.tex("\\alpha", font_size=36, color=ORANGE)
+        alpha_label.move_to(arc_label_positions[1])
         
         # Угол EAB (β) - фиолетовый
-        angle_EAB_radius = 1.4
-        vector_AB = B - A
-        vector_AE_2 = E_pos - A
-        angle_AB = np.arctan2(vector_AB[1], vector_AB[0])
-        angle_AE_2 = np.arctan2(vector_AE_2[1], vector_AE_2[0])
-        
         angle_EAB = Arc(
-            radius=angle_EAB_radius,
-            start_angle=angle_AB,
-            angle=angle_AE_2 - angle_AB,
+            radius=arc_radii[2],
+            start_angle=arc_starts[2],
+            angle=arc_sweeps[2],
             color=PURPLE,
             stroke_width=4
         ).move_arc_center_to(A)
         
-        beta_label = MathTex("\\beta", font_size=36, color=PURPLE)
-        beta_mid_angle = (angle_AB + angle_AE_2) / 2
-        beta_label.move_to(A + (angle_EAB_radius + 0.3) * np.array([np.cos(beta_mid_angle), np.sin(beta_mid_angle), 0]))
+        beta_label = glyph_atlas.tex("\\beta", font_size=36, color=PURPLE)
+        beta_label.move_to(arc_label_positions[2])
         
         self.play(
             Create(angle_DAF),
@@ -207,15 +230,12 @@ class GeometryProblem(Scene):
 
         # Уменьшаем opacity до 30%
         self.play(
-            all_objects_except_conditions.animate.set_opacity(0.3)
+            BatchedStyle(all_objects_except_conditions, "set_opacity", 0.3)
         )
 
 
         # Создаем пунктирную версию треугольника ABE
-        triangle_ABE_dashed = DashedVMobject(
-            Polygon(A, B, E_pos, color=RED, stroke_width=4),
-            num_dashes=75
-        )
+        triangle_ABE_dashed = DashedPolyline(A, B, E_pos, num_dashes=75, color=RED, stroke_width=4)
         
         # Показываем треугольник ABE пунктиром
         self.play(Create(triangle_ABE_dashed))
@@ -239,7 +259,7 @@ class GeometryProblem(Scene):
         rotation_arrow_tip = Triangle(color=YELLOW, fill_opacity=1, stroke_width=0)
         rotation_arrow_tip.set_height(0.2)
         rotation_arrow_tip.rotate(final_angle + PI/2)
-        rotation_arrow_tip.move_to(A + arrow_radius * np.array([np.cos(final_angle), np.sin(final_angle), 0]))
+        rotation_arrow_tip.move_to(geometry.points_on_circle(A, arrow_radius, final_angle))
         
         rotation_group = VGroup(rotation_arc, rotation_arrow_tip)
         
@@ -273,40 +293,18 @@ class GeometryProblem(Scene):
         
 
         # Добавляем подписи B' и E' после поворота
-        B_prime_label = Text("(B')", font_size=24, color=WHITE)
-        E_prime_label = Text("E'", font_size=24, color=WHITE)
-        
-        # Вычисляем позиции после поворота
-        def rotate_point(point, center, angle):
-            translated = point - center
-            rotated_x = translated[0] * np.cos(angle) - translated[1] * np.sin(angle)
-            rotated_y = translated[0] * np.sin(angle) + translated[1] * np.cos(angle)
-            return center + np.array([rotated_x, rotated_y, 0])
-        
-        B_rotated = rotate_point(B, A, -PI/2)
-        E_rotated = rotate_point(E_pos, A, -PI/2)
+        B_prime_label = glyph_atlas.text("(B')", font_size=24, color=WHITE)
+        E_prime_label = glyph_atlas.text("E'", font_size=24, color=WHITE)
         
         B_prime_label.next_to(label_D, RIGHT, buff = 0.15)
         E_prime_label.next_to(label_D, LEFT, buff = 1.75)
-        
-        def rotate_point(point, center, angle):
-            translated = point - center
-            rotated_x = translated[0] * np.cos(angle) - translated[1] * np.sin(angle)
-            rotated_y = translated[0] * np.sin(angle) + translated[1] * np.cos(angle)
-            return center + np.array([rotated_x, rotated_y, 0])
-
-        B_rotated = rotate_point(B, A, -PI/2)
-        E_rotated = rotate_point(E_pos, A, -PI/2)
 
         # Создаем белую пунктирную версию треугольника ABE с новыми координатами
-        triangle_ABE_white_dashed = DashedVMobject(
-            Polygon(A, B_rotated, E_rotated, color=WHITE, stroke_width=4),
-            num_dashes=75
-        )
+        triangle_ABE_white_dashed = DashedPolyline(A, B_rotated, E_rotated, num_dashes=75, color=WHITE, stroke_width=4)
 
         self.play(
             Transform(triangle_ABE_dashed, triangle_ABE_white_dashed),
-            all_objects_except_conditions.animate.set_opacity(1.0),
+            BatchedStyle(all_objects_except_conditions, "set_opacity", 1.0),
             Write(B_prime_label),
             Write(E_prime_label)
         )
@@ -314,23 +312,16 @@ class GeometryProblem(Scene):
         self.wait(2)
 
         # Угол E'AD (β) - фиолетовый такой же как EAB
-        angle_E_prime_AD_radius = 1.4
-        vector_AD_2 = D - A
-        vector_AE_prime = E_rotated - A
-        angle_AD_2 = np.arctan2(vector_AD_2[1], vector_AD_2[0])
-        angle_AE_prime = np.arctan2(vector_AE_prime[1], vector_AE_prime[0])
-
         angle_E_prime_AD = Arc(
-            radius=angle_E_prime_AD_radius,
-            start_angle=angle_AD_2,
-            angle=angle_AE_prime - angle_AD_2,
+            radius=arc_radii[3],
+            start_angle=arc_starts[3],
+            angle=arc_sweeps[3],
             color=PURPLE,
             stroke_width=4
         ).move_arc_center_to(A)
 
-        beta_prime_label = MathTex("\\beta", font_size=36, color=PURPLE)
-        beta_prime_mid_angle = (angle_AD_2 + angle_AE_prime) / 2
-        beta_prime_label.move_to(A + (angle_E_prime_AD_radius + 0.3) * np.array([np.cos(beta_prime_mid_angle), np.sin(beta_prime_mid_angle), 0]))
+        beta_prime_label = glyph_atlas.tex("\\beta", font_size=36, color=PURPLE)
+        beta_prime_label.move_to(arc_label_positions[3])
 
         self.play(
             Create(angle_E_prime_AD),
@@ -340,26 +331,10 @@ class GeometryProblem(Scene):
         
        # Отмечаем равенство сторон AE и AE' одной риской (поперек отрезков)
         # Рисуем риски перпендикулярно сторонам AE и AE'
-        AE_midpoint = (A + E_pos) / 2
-        AE_prime_midpoint = (A + E_rotated) / 2
-
-        # Перпендикулярные векторы для рисок (разные для AE и AE')
-        AE_direction = normalize(E_pos - A)
-        AE_perpendicular = np.array([-AE_direction[1], AE_direction[0], 0]) * 0.15
-
-        AE_prime_direction = normalize(E_rotated - A)
-        AE_prime_perpendicular = np.array([-AE_prime_direction[1], AE_prime_direction[0], 0]) * 0.15
+        AE_mark_ends, AE_prime_mark_ends = geometry.tick_marks(A, [E_pos, E_rotated], half_length=0.15)
 
-        AE_mark = Line(
-            AE_midpoint + AE_perpendicular,
-            AE_midpoint - AE_perpendicular,
-            color=YELLOW, stroke_width=3
-        )
-        AE_prime_mark = Line(
-            AE_prime_midpoint + AE_prime_perpendicular,
-            AE_prime_midpoint - AE_prime_perpendicular,
-            color=YELLOW, stroke_width=3
-        )
+        AE_mark = Line(*AE_mark_ends, color=YELLOW, stroke_width=3)
+        AE_prime_mark = Line(*AE_prime_mark_ends, color=YELLOW, stroke_width=3)
 
         self.play(
             Create(AE_mark),
@@ -381,16 +356,16 @@ class GeometryProblem(Scene):
         self.wait(2)
         # Перекрашиваем существующие дуги E'AD и DAF в желтый и меняем подписи
         self.play(
-            angle_E_prime_AD.animate.set_color(YELLOW),
-            angle_DAF.animate.set_color(YELLOW),
+            BatchedStyle(angle_E_prime_AD, "set_color", YELLOW),
+            BatchedStyle(angle_DAF, "set_color", YELLOW),
             FadeOut(beta_prime_label),
             FadeOut(alpha_label)
         )
 
         # Создаем общую подпись 45° для объединенного угла
-        unified_angle_label = MathTex("45^\\circ", font_size=24, color=YELLOW)
-        unified_mid_angle = (angle_AD_2 + angle_AF_2) / 2
-        unified_angle_label.move_to(A + (1.4 + 0.3) * np.array([np.cos(unified_mid_angle), np.sin(unified_mid_angle), 0]))
+        unified_angle_label = glyph_atlas.tex("45^\\circ", font_size=24, color=YELLOW)
+        # Подпись - на месте убранной α, на биссектрисе DAF: точка внутри угла E'AF, но не на его биссектрисе
+        unified_angle_label.move_to(arc_label_positions[1])
 
 
 
@@ -434,7 +409,7 @@ class GeometryProblem(Scene):
         implication_text = MathTex("\\Rightarrow", font_size=36, color=WHITE)
         implication_text.next_to(conclusion_text, RIGHT, buff=0.2)
 
-        result_text = MathTex("FE' = FE = 17", font_size=40, color=WHITE)
+        result_text = MathTex(f"FE' = FE = {ef_length}", font_size=40, color=WHITE)
         result_text.next_to(implication_text, RIGHT, buff=0.2)
 
 
@@ -480,12 +455,12 @@ class GeometryProblem(Scene):
         )
 
         # Пишем новое уравнение
-        equation_text = MathTex("S_{\\triangle AE'B'} = \\frac{1}{2} \\cdot AD \\cdot E'F = 170", font_size=40, color=WHITE)
+        equation_text = MathTex(f"S_{{\\triangle AE'B'}} = \\frac{{1}}{{2}} \\cdot AD \\cdot E'F = {area}", font_size=40, color=WHITE)
         equation_text.next_to(E_rotated, DOWN+RIGHT*0.4, buff=0.8)
 
         # Стрелка следствия и ответ
         implication_arrow = MathTex("\\Rightarrow", font_size=36, color=WHITE)
-        answer_text = MathTex("\\text{Answer: } AD = 20", font_size=48, color=WHITE)
+        answer_text = MathTex(f"\\text{{Answer: }} AD = {answer}", font_size=48, color=WHITE)
 
         # Позиционируем
         equation_text.next_to(E_rotated, DOWN+RIGHT*0.4, buff=0.8)
@@ -0,0 +1,148 @@
+import configparser
+import gc
+import json
+import os
+import platform
+import weakref
+from pathlib import Path
+
+from manim import logger
+from manim.mobject.svg import svg_mobject
+from manim.utils.iterables import list_update
+
+CONFIG_FILE = Path(__file__).with_name("manim.cfg")
+MB = 1024 * 1024
+
+ARRAY_ATTRS = ("points", "fill_rgbas", "stroke_rgbas", "background_stroke_rgbas")
+
+
+def read_settings(config_file=CONFIG_FILE):
+    parser = configparser.ConfigParser()
+    parser.read(config_file, encoding="utf-8")
+    section = parser["memory"] if parser.has_section("memory") else {}
+    budget_mb = float(section.get("budget_mb", "0"))
+    return {
+        "budget_bytes": int(budget_mb * MB) if budget_mb > 0 else None,
+        "regrowth_bytes": int(float(section.get("regrowth_mb", "64")) * MB),
+    }
+
+
+# === ИЗМЕРЕНИЯ ===
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS - байты
+    return peak / MB if platform.system() == "Darwin" else peak / 1024
+
+
+def current_rss_bytes():
+    # Только Linux; где /proc нет, бюджет считается по байтам мобджектов
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def family_bytes(mobjects):
+    count, size = 0, 0
+    for mob in mobjects:
+        for member in mob.get_family():
+            count += 1
+            size += sum(getattr(member, attr).nbytes for attr in ARRAY_ATTRS if hasattr(member, attr))
+    return count, size
+
+
+def svg_cache_bytes():
+    return family_bytes(svg_mobject.SVG_HASH_TO_MOB_MAP.values())[1]
+
+
+# === РЕНДЕРЕР ===
+
+class MemoryBudgetMixin:
+    # После каждого play() записывает число мобджектов, байты массивов точек и
+    # цветов, размер кэша SVG и RSS; при превышении [memory] budget_mb
+    # сбрасывает кэши и то, что держат уже убранные со сцены объекты
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        settings = read_settings()
+        self.memory_budget = settings["budget_bytes"]
+        self.regrowth = settings["regrowth_bytes"]
+        self.memory_report = []
+        self.evictions = 0
+        # RSS после последнего сброса: почти никогда не опускается ниже бюджета,
+        # поэтому следующий сброс - только когда память выросла еще на regrowth
+        self.evicted_at = None
+        # Слабые ссылки: отчет не должен сам удерживать убранные объекты
+        self.seen_mobjects = weakref.WeakValueDictionary()
+
+    def play(self, scene, *args, **kwargs):
+        super().play(scene, *args, **kwargs)
+        on_scene = list_update(scene.mobjects, scene.foreground_mobjects)
+        for mob in on_scene:
+            self.seen_mobjects[id(mob)] = mob
+        count, size = family_bytes(on_scene)
+        entry = {
+            "index": self.num_plays - 1,
+            "mobjects": count,
+            "array_bytes": size,
+            "svg_cache_bytes": svg_cache_bytes(),
+            "rss_bytes": current_rss_bytes(),
+        }
+        self.memory_report.append(entry)
+
+        if self.memory_budget is not None:
+            used = entry["rss_bytes"] or entry["array_bytes"] + entry["svg_cache_bytes"]
+            if used > self.memory_budget and (self.evicted_at is None or used >= self.evicted_at + self.regrowth):
+                self.evict(scene, on_scene, used)
+
+    def evict(self, scene, on_scene, used):
+        # Кэш SVG заполняется заново при следующей подписи;
+        # слои static_layers и битмапы подписей перерастеризуются; у ушедших со
+        # сцены объектов (FadeOut) убираем копии .target от .animate - сами
+        # объекты держит construct, их не трогаем
+        svg_mobject.SVG_HASH_TO_MOB_MAP.clear()
+        if hasattr(self, "layer_cache"):
+            self.layer_cache.clear()
+        if hasattr(self, "glyph_bitmaps"):
+            self.glyph_bitmaps.clear()
+            self.glyph_seen.clear()
+        on_scene_ids = {id(member) for mob in on_scene for member in mob.get_family()}
+        removed = [mob for key, mob in list(self.seen_mobjects.items()) if key not in on_scene_ids]
+        for mob in removed:
+            for member in mob.get_family():
+                if getattr(member, "target", None) is not None:
+                    member.target = None
+        self.seen_mobjects = weakref.WeakValueDictionary({id(mob): mob for mob in on_scene})
+        removed_count = len(removed)
+        del removed
+        gc.collect()
+
+        self.evictions += 1
+        after = current_rss_bytes()
+        self.evicted_at = after if after is not None else used
+        freed = f", RSS {used / MB:.0f} -> {after / MB:.0f} МБ" if after is not None else ""
+        logger.info(f"memory_budget: превышен бюджет {self.memory_budget / MB:.0f} МБ, "
+                    f"сброшены кэши, ушедших со сцены объектов: {removed_count}{freed}")
+
+    def scene_finished(self, scene):
+        super().scene_finished(scene)
+        peak = peak_rss_mb()
+        arrays = max((entry["array_bytes"] for entry in self.memory_report), default=0)
+        logger.info(f"memory_budget: пик RSS {peak or 0:.0f} МБ, пик массивов сцены {arrays / MB:.1f} МБ, "
+                    f"сбросов {self.evictions}")
+        movie_file_path = getattr(self.file_writer, "movie_file_path", None)
+        if movie_file_path is None or not self.memory_report:
+            return
+        report_path = Path(movie_file_path).with_suffix(".memory.json")
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(json.dumps({
+            "peak_rss_mb": peak,
+            "budget_mb": self.memory_budget / MB if self.memory_budget else None,
+            "evictions": self.evictions,
+            "plays": self.memory_report,
+        }, indent=2), encoding="utf-8")
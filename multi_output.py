@@ -0,0 +1,211 @@
+import configparser
+import contextlib
+import functools
+import re
+from pathlib import Path
+
+import numpy as np
+from manim import config, logger
+from manim.utils.file_ops import is_png_format
+from manim.utils.iterables import list_update
+
+CONFIG_FILE = Path(__file__).with_name("manim.cfg")
+
+# "1920x1080@60" или "480x854@30 webm": ширина x высота @ fps [контейнер]
+PROFILE_PATTERN = re.compile(r"^\s*(\d+)\s*x\s*(\d+)\s*@\s*(\d+(?:\.\d+)?)\s*(mp4|mov|webm)?\s*$")
+
+
+def parse_profile(name, value):
+    match = PROFILE_PATTERN.match(value)
+    if match is None:
+        raise ValueError(f"Профиль {name}: ожидается ШИРИНАxВЫСОТА@FPS [mp4|mov|webm], получено {value!r}")
+    width, height, fps, container = match.groups()
+    return {
+        "name": name,
+        "pixel_width": int(width),
+        "pixel_height": int(height),
+        "frame_rate": float(fps),
+        "movie_file_extension": f".{container or 'mp4'}",
+    }
+
+
+def read_profiles(config_file=CONFIG_FILE):
+    parser = configparser.ConfigParser()
+    parser.read(config_file, encoding="utf-8")
+    if not parser.has_section("output_profiles"):
+        return []
+    return [parse_profile(name, value) for name, value in parser.items("output_profiles")]
+
+
+# === ДОПОЛНИТЕЛЬНЫЙ ВЫХОД ===
+
+class ExtraOutput:
+    # Своя камера и свой SceneFileWriter на профиль; config подменяется только
+    # на время вызовов писателя (каталог качества, размер и fps потока берутся из него)
+    def __init__(self, profile, renderer, writer_class, scene_name):
+        self.profile = profile
+        self.step = round(renderer.camera.frame_rate / profile["frame_rate"])
+        if self.step < 1 or abs(self.step * profile["frame_rate"] - renderer.camera.frame_rate) > 1e-6:
+            raise ValueError(
+                f"Профиль {profile['name']}: {profile['frame_rate']:g} fps не делит "
+                f"основные {renderer.camera.frame_rate:g} fps"
+            )
+        self.static_image = None
+        with self.active():
+            self.camera = type(renderer.camera)()
+            self.writer = writer_class(renderer, scene_name)
+
+    @contextlib.contextmanager
+    def active(self):
+        keys = ("pixel_width", "pixel_height", "frame_rate", "movie_file_extension")
+        saved = {key: config[key] for key in keys}
+        try:
+            for key in keys:
+                config[key] = self.profile[key]
+            yield
+        finally:
+            for key, value in saved.items():
+                config[key] = value
+
+    def sync_camera(self, main_camera):
+        # Сцена меняет кадр и фон основной камеры (GeometryProblem: 24.5x14)
+        camera = self.camera
+        camera.frame_width = main_camera.frame_width
+        camera.frame_height = main_camera.frame_height
+        camera.frame_center = main_camera.frame_center
+        if (camera.background_color, camera.background_opacity) != (
+                main_camera.background_color, main_camera.background_opacity):
+            camera.background_color = main_camera.background_color
+            camera.background_opacity = main_camera.background_opacity
+
+    def rasterize(self, main_camera, mobjects, static_mobjects=None):
+        self.sync_camera(main_camera)
+        camera = self.camera
+        if static_mobjects is not None:
+            camera.reset()
+            camera.capture_mobjects(static_mobjects)
+            self.static_image = camera.pixel_array.copy()
+        if self.static_image is not None:
+            camera.set_frame_to_background(self.static_image)
+        else:
+            camera.reset()
+        camera.capture_mobjects(mobjects)
+        return np.array(camera.pixel_array)
+
+
+# === ЗАПИСЬ ===
+
+@functools.lru_cache(maxsize=None)
+def multi_output_writer(base):
+    class MultiOutputFileWriter(base):
+        # Повторяет жизненный цикл частичных файлов на всех доп. выходах;
+        # кадры им отдает рендерер, а не write_frame
+        def forward(self, method, *args, **kwargs):
+            for output in self.renderer.extra_outputs:
+                with output.active():
+                    getattr(output.writer, method)(*args, **kwargs)
+
+        def is_already_cached(self, hash_invocation):
+            # Сегмент берется из кэша, только если он есть во всех профилях
+            return super().is_already_cached(hash_invocation) and all(
+                output.writer.is_already_cached(hash_invocation) for output in self.renderer.extra_outputs
+            )
+
+        def add_partial_movie_file(self, hash_animation):
+            super().add_partial_movie_file(hash_animation)
+            self.forward("add_partial_movie_file", hash_animation)
+
+        def begin_animation(self, allow_write=False, file_path=None):
+            super().begin_animation(allow_write, file_path)
+            self.forward("begin_animation", allow_write, file_path)
+
+        def end_animation(self, allow_write=False):
+            super().end_animation(allow_write)
+            self.forward("end_animation", allow_write)
+
+        def next_section(self, *args, **kwargs):
+            super().next_section(*args, **kwargs)
+            self.forward("next_section", *args, **kwargs)
+
+        def finish(self):
+            super().finish()
+            self.forward("finish")
+
+    return MultiOutputFileWriter
+
+
+# === РЕНДЕРЕР ===
+
+class MultiOutputMixin:
+    # Один проход сцены пишет основной файл (настройки manim/CLI) и файлы
+    # всех профилей из [output_profiles]: каждый кадр растеризуется в каждом
+    # размере, кадры профиля с меньшим fps прореживаются
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.extra_writer_class = None
+        self.extra_outputs = []
+        self.playing_scene = None
+        self.play_frame = 0
+
+    def init_scene(self, scene):
+        if self.extra_writer_class is None:
+            # Класс писателя оборачивается здесь, когда остальные режимы уже
+            # добавили свои обертки: доп. выходы получают их же
+            self.extra_writer_class = self._file_writer_class
+            self._file_writer_class = multi_output_writer(self._file_writer_class)
+        main = (config.pixel_width, config.pixel_height, self.camera.frame_rate, config.movie_file_extension)
+        self.extra_outputs = []
+        for profile in read_profiles():
+            key = (profile["pixel_width"], profile["pixel_height"], profile["frame_rate"],
+                   profile["movie_file_extension"])
+            if key == main:
+                # Совпадает с основным выходом - тот же каталог качества
+                continue
+            self.extra_outputs.append(ExtraOutput(profile, self, self.extra_writer_class, scene.__class__.__name__))
+        super().init_scene(scene)
+
+    def play(self, scene, *args, **kwargs):
+        self.playing_scene = scene
+        self.play_frame = 0
+        try:
+            super().play(scene, *args, **kwargs)
+        finally:
+            self.playing_scene = None
+
+    def render(self, scene, time, moving_mobjects):
+        super().render(scene, time, moving_mobjects)
+        if self.skip_animations or not self.extra_outputs:
+            return
+        # Неподвижный фон доп. выходов строится в первом кадре каждого play()
+        static_mobjects = scene.static_mobjects if self.play_frame == 0 else None
+        for output in self.extra_outputs:
+            if self.play_frame % output.step:
+                continue
+            frame = output.rasterize(self.camera, moving_mobjects, static_mobjects)
+            with output.active():
+                output.writer.write_frame(frame)
+        self.play_frame += 1
+
+    def freeze_current_frame(self, duration):
+        super().freeze_current_frame(duration)
+        scene = self.playing_scene
+        if self.skip_animations or scene is None:
+            return
+        mobjects = list_update(scene.mobjects, scene.foreground_mobjects)
+        for output in self.extra_outputs:
+            output.static_image = None
+            frame = output.rasterize(self.camera, mobjects)
+            num_frames = int(duration / (1 / output.profile["frame_rate"]))
+            with output.active():
+                # N-1 + замыкающий кадр: писатель adaptive_fps в режиме vfr
+                # кодирует удерживаемый кадр один раз, длительность задает следующий
+                if num_frames > 1 and not is_png_format():
+                    output.writer.write_frame(frame, num_frames=num_frames - 1)
+                    output.writer.write_frame(frame, num_frames=1)
+                else:
+                    output.writer.write_frame(frame, num_frames=num_frames)
+
+    def scene_finished(self, scene):
+        super().scene_finished(scene)
+        for output in self.extra_outputs:
+            logger.info(f"multi_output: {output.profile['name']} -> {output.writer.movie_file_path}")
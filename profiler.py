@@ -0,0 +1,192 @@
+import argparse
+import json
+import threading
+import time
+from pathlib import Path
+
+from manim import tempconfig
+from manim.renderer.cairo_renderer import CairoRenderer
+from manim.scene.scene_file_writer import SceneFileWriter
+
+from segment_render import load_scene_class, render_options
+
+MAIN_THREAD = 1
+WRITER_THREAD = 2
+
+
+# === СБОР СОБЫТИЙ ===
+
+class Trace:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.plays = []
+        self.lock = threading.Lock()
+
+    def now(self):
+        return time.perf_counter()
+
+    def add(self, name, start, end, tid=MAIN_THREAD, **args):
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": 1,
+            "tid": tid,
+            "args": args,
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def chrome_trace(self):
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": MAIN_THREAD, "args": {"name": "scene"}},
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": WRITER_THREAD, "args": {"name": "encoder"}},
+        ]
+        return {"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}
+
+
+class ProfilingFileWriter(SceneFileWriter):
+    def encode_and_write_frame(self, frame, num_frames):
+        trace = self.renderer.trace
+        start = trace.now()
+        super().encode_and_write_frame(frame, num_frames)
+        end = trace.now()
+        trace.add("encode", start, end, tid=WRITER_THREAD, frames=num_frames)
+        if self.renderer.current is not None:
+            self.renderer.current["encode"] += end - start
+
+    def close_partial_movie_stream(self):
+        trace = self.renderer.trace
+        start = trace.now()
+        super().close_partial_movie_stream()
+        end = trace.now()
+        trace.add("flush", start, end)
+        if self.renderer.current is not None:
+            self.renderer.current["flush"] += end - start
+            self.renderer.current["encode"] += end - start
+
+
+class ProfilingRenderer(CairoRenderer):
+    def __init__(self, **kwargs):
+        kwargs.setdefault("file_writer_class", ProfilingFileWriter)
+        super().__init__(**kwargs)
+        self.trace = Trace()
+        self.current = None
+        self.last_play_end = self.trace.now()
+
+    def init_scene(self, scene):
+        super().init_scene(scene)
+        original_update_to_time = scene.update_to_time
+
+        # Интерполяция анимаций на каждом кадре
+        def update_to_time(t):
+            start = self.trace.now()
+            original_update_to_time(t)
+            end = self.trace.now()
+            self.trace.add("interpolate", start, end, t=t)
+            if self.current is not None:
+                self.current["interpolate"] += end - start
+
+        scene.update_to_time = update_to_time
+
+    def play(self, scene, *args, **kwargs):
+        start = self.trace.now()
+        # Время между play() - это код construct: создание мобджектов, TeX и т.д.
+        self.trace.add("construct", self.last_play_end, start)
+        self.current = {
+            "index": self.num_plays,
+            "construct": start - self.last_play_end,
+            "interpolate": 0.0,
+            "rasterize": 0.0,
+            "encode": 0.0,
+            "flush": 0.0,
+            "frames": 0,
+        }
+        super().play(scene, *args, **kwargs)
+        end = self.trace.now()
+
+        animations = scene.animations or []
+        label = str(animations[0]) + (", ..." if len(animations) > 1 else "") if animations else "?"
+        self.current.update({"label": label, "total": end - start, "duration": scene.duration})
+        # setup: compile/begin анимаций, хеш play(), открытие потока записи
+        busy = self.current["interpolate"] + self.current["rasterize"] + self.current["flush"]
+        self.current["setup"] = end - start - busy
+        self.trace.add(f"play {self.current['index']}: {label}", start, end, frames=self.current["frames"])
+        self.trace.plays.append(self.current)
+        self.current = None
+        self.last_play_end = end
+
+    def update_frame(self, *args, **kwargs):
+        start = self.trace.now()
+        super().update_frame(*args, **kwargs)
+        end = self.trace.now()
+        self.trace.add("rasterize", start, end)
+        if self.current is not None:
+            self.current["rasterize"] += end - start
+
+    def add_frame(self, frame, num_frames=1):
+        if self.current is not None and not self.skip_animations:
+            self.current["frames"] += num_frames
+        super().add_frame(frame, num_frames)
+
+
+# === ОТЧЕТ ===
+
+def summary_table(plays):
+    columns = ("construct", "setup", "interpolate", "rasterize", "encode")
+    header = f"{'#':>3}  {'анимация':<40} {'кадры':>6} " + " ".join(f"{name:>11}" for name in columns)
+    lines = [header, "-" * len(header)]
+    totals = dict.fromkeys(columns, 0.0)
+    frames = 0
+    for play in plays:
+        frames += play["frames"]
+        for name in columns:
+            totals[name] += play[name]
+        cells = " ".join(f"{1000 * play[name]:>9.1f}ms" for name in columns)
+        lines.append(f"{play['index']:>3}  {play['label'][:40]:<40} {play['frames']:>6} {cells}")
+    lines.append("-" * len(header))
+    cells = " ".join(f"{1000 * totals[name]:>9.1f}ms" for name in columns)
+    lines.append(f"{'':>3}  {'итого':<40} {frames:>6} {cells}")
+    return "\n".join(lines)
+
+
+def profile_scene(file_path, scene_name, quality=None, scene_kwargs=None):
+    # Без кэша частичных файлов, иначе закэшированные play() не рендерятся вовсе
+    options = {**render_options(file_path, quality), "disable_caching": True}
+    with tempconfig(options):
+        scene_class = load_scene_class(file_path, scene_name)
+        renderer = ProfilingRenderer()
+        scene = scene_class(renderer=renderer, **(scene_kwargs or {}))
+        scene.render()
+    return renderer.trace
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Профилирование рендера сцены по play()")
+    parser.add_argument("file", help="файл со сценой, например main.py")
+    parser.add_argument("scene", help="имя класса сцены")
+    parser.add_argument("-q", "--quality", default=None)
+    parser.add_argument("-o", "--output", default=None, help="куда записать trace (Chrome trace JSON)")
+    parser.add_argument("--params", default=None, help="параметры задачи в JSON")
+    args = parser.parse_args()
+
+    scene_kwargs = {"params": json.loads(args.params)} if args.params else None
+    trace = profile_scene(args.file, args.scene, args.quality, scene_kwargs)
+
+    output = Path(args.output or f"media/profile/{args.scene}.trace.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(trace.chrome_trace(), f)
+
+    print(summary_table(trace.plays))
+    print(f"\nTrace: {output} (открыть в chrome://tracing или ui.perfetto.dev)")
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Запуск:
+# python profiler.py main.py GeometryProblem -q low_quality
@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import time
+import traceback
+
+# manim импортируется только в процессе демона (serve), клиент остается легким
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+# === ДЕМОН ===
+
+class RenderDaemon:
+    def __init__(self):
+        start = time.perf_counter()
+        from manim import tempconfig
+        from manim.renderer.cairo_renderer import CairoRenderer
+        from manim.scene.scene_file_writer import SceneFileWriter
+
+        import segment_render
+
+        self.tempconfig = tempconfig
+        self.CairoRenderer = CairoRenderer
+        self.segment_render = segment_render
+        self.TimedFileWriter = make_timed_file_writer(SceneFileWriter)
+        self.import_seconds = time.perf_counter() - start
+        self.jobs_done = 0
+
+    def render(self, job):
+        options = self.segment_render.render_options(job["file"], job.get("quality"))
+        if job.get("output_file"):
+            options["output_file"] = job["output_file"]
+        scene_kwargs = {"params": job["params"]} if job.get("params") else {}
+
+        timings = {"daemon_import": self.import_seconds}
+        start = time.perf_counter()
+        with self.tempconfig(options):
+            # Модуль сцены перечитываем на каждую задачу, чтобы подхватить правки;
+            # manim, шрифты, шаблон TeX и кэши остаются прогретыми
+            scene_class = self.segment_render.load_scene_class(job["file"], job["scene"])
+            renderer = self.CairoRenderer(file_writer_class=self.TimedFileWriter)
+            scene = scene_class(renderer=renderer, **scene_kwargs)
+            timings["startup"] = time.perf_counter() - start
+
+            render_start = time.perf_counter()
+            scene.render()
+            writer = renderer.file_writer
+            timings["render"] = time.perf_counter() - render_start - writer.finish_seconds
+            timings["encode"] = writer.encode_seconds + writer.finish_seconds
+            output = str(getattr(writer, "movie_file_path", ""))
+
+        timings["total"] = time.perf_counter() - start
+        self.jobs_done += 1
+        return {"ok": True, "output": output, "timings": timings}
+
+    def handle(self, request):
+        command = request.get("command", "render")
+        if command == "ping":
+            return {"ok": True, "jobs_done": self.jobs_done, "daemon_import": self.import_seconds}
+        if command == "render":
+            try:
+                return self.render(request)
+            except Exception:
+                return {"ok": False, "error": traceback.format_exc()}
+        return {"ok": False, "error": f"Неизвестная команда: {command}"}
+
+
+def make_timed_file_writer(base):
+    class TimedFileWriter(base):
+        # Кодирование идет в потоке записи параллельно с растеризацией,
+        # поэтому encode считается отдельно и пересекается с render
+        def __init__(self, *args, **kwargs):
+            self.encode_seconds = 0.0
+            self.finish_seconds = 0.0
+            super().__init__(*args, **kwargs)
+
+        def encode_and_write_frame(self, frame, num_frames):
+            start = time.perf_counter()
+            super().encode_and_write_frame(frame, num_frames)
+            self.encode_seconds += time.perf_counter() - start
+
+        def close_partial_movie_stream(self):
+            start = time.perf_counter()
+            super().close_partial_movie_stream()
+            self.encode_seconds += time.perf_counter() - start
+
+        def finish(self):
+            start = time.perf_counter()
+            super().finish()
+            self.finish_seconds += time.perf_counter() - start
+
+    return TimedFileWriter
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {"ok": False, "error": "Ожидалась одна строка JSON"}
+        else:
+            if request.get("command") == "shutdown":
+                response = {"ok": True}
+                self.server.shutdown_requested = True
+            else:
+                response = self.server.render_daemon.handle(request)
+        self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class DaemonServer(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    daemon = RenderDaemon()
+    print(f"manim загружен за {daemon.import_seconds:.2f} с, слушаю {host}:{port}", flush=True)
+    # Задачи выполняются строго по одной: config manim глобальный
+    with DaemonServer((host, port), RequestHandler) as server:
+        server.render_daemon = daemon
+        server.shutdown_requested = False
+        while not server.shutdown_requested:
+            server.handle_request()
+
+
+# === КЛИЕНТ ===
+
+def submit(request, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    with socket.create_connection((host, port)) as connection:
+        connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with connection.makefile("r", encoding="utf-8") as reader:
+            return json.loads(reader.readline())
+
+
+def print_response(response):
+    if not response.get("ok"):
+        print(response.get("error"))
+        return
+    if "timings" in response:
+        timings = response["timings"]
+        print(f"Готово: {response['output']}")
+        print(f"  старт сцены: {timings['startup']:.2f} с (импорт manim сэкономлен: {timings['daemon_import']:.2f} с)")
+        print(f"  рендер:      {timings['render']:.2f} с")
+        print(f"  кодирование: {timings['encode']:.2f} с")
+        print(f"  всего:       {timings['total']:.2f} с")
+    else:
+        print(json.dumps(response, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Демон рендера manim с прогретым состоянием")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("serve", help="запустить демон")
+    commands.add_parser("ping", help="проверить, что демон жив")
+    commands.add_parser("shutdown", help="остановить демон")
+
+    render = commands.add_parser("render", help="отправить задачу рендера")
+    render.add_argument("file", help="файл со сценой, например main.py")
+    render.add_argument("scene", help="имя класса сцены")
+    render.add_argument("-q", "--quality", default=None)
+    render.add_argument("-o", "--output-file", default=None)
+    render.add_argument("--params", default=None, help="параметры задачи в JSON")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port)
+        return
+
+    request = {"command": args.command}
+    if args.command == "render":
+        request.update({
+            "file": os.path.abspath(args.file),
+            "scene": args.scene,
+            "quality": args.quality,
+            "output_file": args.output_file,
+            "params": json.loads(args.params) if args.params else None,
+        })
+    response = submit(request, args.host, args.port)
+    print_response(response)
+    raise SystemExit(0 if response.get("ok") else 1)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Запуск:
+# python render_daemon.py serve &
+# python render_daemon.py render main.py GeometryProblem -q low_quality --params '{"area": 200}'
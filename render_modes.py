@@ -0,0 +1,46 @@
+import configparser
+import importlib
+from pathlib import Path
+
+from manim.renderer.cairo_renderer import CairoRenderer
+
+CONFIG_FILE = Path(__file__).with_name("manim.cfg")
+
+# Режим рендера -> (модуль, класс-примесь к CairoRenderer)
+MODES = {
+    # Первым: дописывает кадры доп. профилей после render() остальных режимов
+    "multi_output": ("multi_output", "MultiOutputMixin"),
+    # Сразу за multi_output: доп. профили получают все кадры, остальные режимы - только отобранные
+    "adaptive_fps": ("adaptive_fps", "AdaptiveFpsMixin"),
+    "static_layers": ("static_layers", "StaticLayerMixin"),
+    "glyph_bitmaps": ("glyph_atlas", "GlyphBitmapMixin"),
+    "held_waits": ("held_frames", "HeldFrameMixin"),
+    "incremental": ("incremental", "IncrementalMixin"),
+    "streaming": ("streaming", "StreamingMixin"),
+    "memory_budget": ("memory_budget", "MemoryBudgetMixin"),
+}
+
+
+def enabled_modes(config_file=CONFIG_FILE):
+    parser = configparser.ConfigParser()
+    parser.read(config_file, encoding="utf-8")
+    if not parser.has_section("render_modes"):
+        return []
+    return [name for name in MODES if parser.getboolean("render_modes", name, fallback=False)]
+
+
+def make_renderer_class(modes, base=CairoRenderer):
+    mixins = []
+    for name in modes:
+        module_name, class_name = MODES[name]
+        mixins.append(getattr(importlib.import_module(module_name), class_name))
+    if not mixins:
+        return base
+    # Примеси кооперативные (super()), порядок - как в MODES
+    return type("ModeRenderer", (*mixins, base), {"modes": tuple(modes)})
+
+
+def make_renderer(modes=None, base=CairoRenderer, **kwargs):
+    if modes is None:
+        modes = enabled_modes()
+    return make_renderer_class(modes, base)(**kwargs)
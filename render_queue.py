@@ -0,0 +1,470 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+DEFAULT_DB = ROOT / "media" / "queue.sqlite"
+DEFAULT_OUT_DIR = ROOT / "media" / "queue"
+
+# Задача без пульса дольше LEASE_SECONDS считается брошенной (воркер упал)
+HEARTBEAT_SECONDS = 10
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    depends_on TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    seconds REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE TABLE IF NOT EXISTS workers (
+    name TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    busy_seconds REAL NOT NULL DEFAULT 0,
+    jobs_done INTEGER NOT NULL DEFAULT 0,
+    jobs_failed INTEGER NOT NULL DEFAULT 0,
+    current_job INTEGER
+);
+"""
+
+
+# === ОЧЕРЕДЬ В SQLITE ===
+
+class RenderQueue:
+    # Файл базы должен лежать на ФС с рабочими блокировками (локальный диск
+    # или NFS с lockd): все воркеры фермы ходят в одну базу
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def connect(self):
+        # Соединение на один вызов и всегда закрывается: долгоживущий воркер
+        # не копит открытые дескрипторы базы
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def add(self, name, kind, payload, depends_on=()):
+        payload, depends_on = json.dumps(payload), json.dumps(list(depends_on))
+        now = time.time()
+        with self.connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT id, status, payload, depends_on FROM jobs WHERE name = ?",
+                                 (name,)).fetchone()
+                if row is None:
+                    job_id = db.execute(
+                        "INSERT INTO jobs (name, kind, payload, depends_on, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                        (name, kind, payload, depends_on, now),
+                    ).lastrowid
+                elif row["status"] in ("done", "failed") or (row["payload"], row["depends_on"]) != (payload, depends_on):
+                    # Повторная постановка (ночной запуск): готовая задача рендерится
+                    # заново, измененная - с новыми параметрами; результат воркера,
+                    # который еще держит старую версию, finish() уже не запишет
+                    job_id = row["id"]
+                    db.execute(
+                        "UPDATE jobs SET kind = ?, payload = ?, depends_on = ?, status = 'queued', attempts = 0, "
+                        "worker = NULL, enqueued_at = ?, started_at = NULL, heartbeat_at = NULL, "
+                        "finished_at = NULL, seconds = NULL, result = NULL, error = NULL WHERE id = ?",
+                        (kind, payload, depends_on, now, job_id),
+                    )
+                else:
+                    # Та же задача уже ждет или выполняется - не дублируем
+                    job_id = row["id"]
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, worker):
+        now = time.time()
+        with self.connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                self.requeue_stale(db, now)
+                done = {row["id"] for row in db.execute("SELECT id FROM jobs WHERE status = 'done'")}
+                failed = {row["id"] for row in db.execute("SELECT id FROM jobs WHERE status = 'failed'")}
+                for row in db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id").fetchall():
+                    if row["attempts"] >= MAX_ATTEMPTS:
+                        db.execute("UPDATE jobs SET status = 'failed', finished_at = ? WHERE id = ?", (now, row["id"]))
+                        failed.add(row["id"])
+                        continue
+                    depends_on = set(json.loads(row["depends_on"]))
+                    if depends_on & failed:
+                        db.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                                   ("Не выполнена зависимость", now, row["id"]))
+                        failed.add(row["id"])
+                        continue
+                    if not depends_on <= done:
+                        continue
+                    db.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                        "started_at = ?, heartbeat_at = ?, error = NULL WHERE id = ?",
+                        (worker, now, now, row["id"]),
+                    )
+                    db.execute("UPDATE workers SET current_job = ?, heartbeat_at = ? WHERE name = ?",
+                               (row["id"], now, worker))
+                    db.execute("COMMIT")
+                    job = dict(row)
+                    job["attempts"] += 1
+                    job["payload"] = json.loads(job["payload"])
+                    return job
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return None
+
+    def requeue_stale(self, db, now):
+        db.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "worker = NULL, error = 'Воркер перестал отвечать' "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (MAX_ATTEMPTS, now - LEASE_SECONDS),
+        )
+        db.execute("UPDATE workers SET current_job = NULL WHERE heartbeat_at < ?", (now - LEASE_SECONDS,))
+
+    def release_worker(self, worker):
+        # Воркер упал - его задачи возвращаются в очередь сразу, не дожидаясь аренды;
+        # задача, которая роняет процесс каждый раз, после MAX_ATTEMPTS - ошибка
+        with self.connect() as db:
+            db.execute("UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                       "worker = NULL, finished_at = ?, error = 'Воркер упал' "
+                       "WHERE status = 'running' AND worker = ?", (MAX_ATTEMPTS, time.time(), worker))
+            db.execute("UPDATE workers SET current_job = NULL WHERE name = ?", (worker,))
+
+    def register_worker(self, worker):
+        now = time.time()
+        with self.connect() as db:
+            db.execute("INSERT OR REPLACE INTO workers (name, started_at, heartbeat_at) VALUES (?, ?, ?)",
+                       (worker, now, now))
+
+    def heartbeat(self, worker):
+        now = time.time()
+        with self.connect() as db:
+            db.execute("UPDATE workers SET heartbeat_at = ? WHERE name = ?", (now, worker))
+            db.execute("UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND worker = ?", (now, worker))
+
+    def finish(self, job, worker, seconds, result=None, error=None):
+        now = time.time()
+        if error is None:
+            status = "done"
+        else:
+            status = "failed" if job["attempts"] >= MAX_ATTEMPTS else "queued"
+        with self.connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, seconds = ?, result = ?, error = ?, worker = NULL "
+                "WHERE id = ? AND worker = ?",
+                (status, now, seconds, json.dumps(result), error, job["id"], worker),
+            )
+            db.execute(
+                "UPDATE workers SET busy_seconds = busy_seconds + ?, current_job = NULL, heartbeat_at = ?, "
+                "jobs_done = jobs_done + ?, jobs_failed = jobs_failed + ? WHERE name = ?",
+                (seconds, now, int(error is None), int(error is not None), worker),
+            )
+
+    def retry_failed(self):
+        with self.connect() as db:
+            return db.execute("UPDATE jobs SET status = 'queued', attempts = 0, error = NULL "
+                              "WHERE status = 'failed'").rowcount
+
+    def results(self, ids):
+        with self.connect() as db:
+            rows = db.execute(f"SELECT id, result FROM jobs WHERE id IN ({','.join('?' * len(ids))})",
+                              list(ids)).fetchall()
+        return {row["id"]: json.loads(row["result"]) for row in rows}
+
+    def pending(self):
+        with self.connect() as db:
+            return db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+
+    # --- метрики ---
+
+    def stats(self, window=3600):
+        now = time.time()
+        with self.connect() as db:
+            depth = {row["status"]: row["n"] for row in
+                     db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+            recent = db.execute("SELECT COUNT(*) AS n, AVG(seconds) AS avg FROM jobs "
+                                "WHERE status = 'done' AND finished_at > ?", (now - window,)).fetchone()
+            workers = [dict(row) for row in db.execute("SELECT * FROM workers ORDER BY name")]
+        for worker in workers:
+            alive = worker["heartbeat_at"] - worker["started_at"]
+            worker["active"] = now - worker["heartbeat_at"] < LEASE_SECONDS
+            worker["utilization"] = worker["busy_seconds"] / alive if alive > 0 else 0.0
+        return {
+            "depth": {status: depth.get(status, 0) for status in ("queued", "running", "done", "failed")},
+            "done_per_hour": recent["n"] * 3600 / window,
+            "avg_job_seconds": recent["avg"],
+            "workers": workers,
+        }
+
+
+# === ВЫПОЛНЕНИЕ ЗАДАЧ ===
+
+def drop_broken_partials(directory):
+    # Упавший посреди записи рендер оставляет обрезанный частичный файл с
+    # правильным именем - manim принял бы его за готовый; удаляем такие,
+    # целые файлы переиспользуются по хешу. Каталог должен принадлежать
+    # одной задаче: недописанный файл живого воркера тоже не открывается
+    import av
+
+    directory = Path(directory)
+    if not directory.is_dir():
+        return 0
+    dropped = 0
+    for path in directory.glob("*.*"):
+        if path.suffix not in (".mp4", ".mov", ".webm"):
+            continue
+        try:
+            with av.open(str(path)) as container:
+                if not container.streams.video or container.duration is None:
+                    raise ValueError("нет видеопотока")
+        except Exception:
+            path.unlink(missing_ok=True)
+            dropped += 1
+    return dropped
+
+
+def job_options(name, out_dir, file_path, quality=None):
+    # Каталоги как в batch_render: свои видео и частичные файлы на задачу
+    from batch_render import job_config
+
+    return {**job_config({"name": name}, out_dir, quality), "input_file": str(Path(file_path).absolute())}
+
+
+def execute(queue, job):
+    from batch_render import scene_config
+
+    payload = job["payload"]
+    options = payload["options"]
+    if job["attempts"] > 1:
+        drop_broken_partials(options["partial_movie_dir"])
+
+    if job["kind"] == "geometry":
+        from memory_budget import peak_rss_mb
+
+        with scene_config("main", options) as main:
+            scene = main.GeometryProblem(params=payload["params"])
+            scene.render()
+        return {"output": str(scene.renderer.file_writer.movie_file_path), "peak_rss_mb": peak_rss_mb()}
+
+    if job["kind"] == "spec":
+        with scene_config("spec_scene", options) as spec_scene:
+            scene = spec_scene.SpecScene(spec_path=payload["spec"], params=payload.get("params"))
+            scene.render()
+        return {"output": str(scene.renderer.file_writer.movie_file_path)}
+
+    from segment_render import combine_segments, render_segment
+
+    if job["kind"] == "segment":
+        segment = render_segment(payload["file"], payload["scene"], payload["start"], payload["end"], options=options)
+        return {"start": segment["start"], "end": segment["end"], "files": segment["files"]}
+
+    if job["kind"] == "combine":
+        segments = list(queue.results(json.loads(job["depends_on"])).values())
+        return {"output": str(combine_segments(payload["file"], payload["scene"], segments, options))}
+
+    raise ValueError(f"Неизвестный тип задачи: {job['kind']}")
+
+
+def heartbeat_loop(queue, worker, stop):
+    while not stop.wait(HEARTBEAT_SECONDS):
+        try:
+            queue.heartbeat(worker)
+        except sqlite3.Error:
+            pass
+
+
+def work(db_path, worker, exit_when_empty=False, poll_seconds=5):
+    queue = RenderQueue(db_path)
+    queue.register_worker(worker)
+    stop = threading.Event()
+    threading.Thread(target=heartbeat_loop, args=(queue, worker, stop), daemon=True).start()
+    try:
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                if exit_when_empty and not queue.pending():
+                    return
+                time.sleep(poll_seconds)
+                continue
+            start = time.perf_counter()
+            try:
+                result = execute(queue, job)
+            except Exception:
+                queue.finish(job, worker, time.perf_counter() - start, error=traceback.format_exc())
+                print(f"[{worker}] FAIL {job['name']} (попытка {job['attempts']})", flush=True)
+            else:
+                queue.finish(job, worker, time.perf_counter() - start, result=result)
+                print(f"[{worker}] OK   {job['name']} ({time.perf_counter() - start:.1f} с)", flush=True)
+    finally:
+        stop.set()
+
+
+def run_pool(db_path, processes, exit_when_empty=False):
+    # Локальный пул: по процессу на воркер, упавший процесс перезапускается,
+    # а его задача сразу возвращается в очередь
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    queue = RenderQueue(db_path)
+    slots = {}
+    for index in range(processes):
+        name = f"{prefix}-{index}"
+        slots[name] = multiprocessing.Process(target=work, args=(db_path, name, exit_when_empty), name=name)
+        slots[name].start()
+
+    while slots:
+        time.sleep(1)
+        for name, process in list(slots.items()):
+            if process.is_alive():
+                continue
+            if process.exitcode == 0:
+                del slots[name]
+                continue
+            print(f"Воркер {name} упал (код {process.exitcode}), перезапуск", flush=True)
+            queue.release_worker(name)
+            slots[name] = multiprocessing.Process(target=work, args=(db_path, name, exit_when_empty), name=name)
+            slots[name].start()
+
+
+# === ПОСТАНОВКА ЗАДАЧ ===
+
+def add_geometry_jobs(queue, jobs_file, out_dir, quality=None):
+    from batch_render import MAIN_FILE, load_jobs
+
+    return [
+        queue.add(job["name"], "geometry", {
+            "params": job["params"],
+            "options": job_options(job["name"], out_dir, MAIN_FILE, quality),
+        })
+        for job in load_jobs(jobs_file)
+    ]
+
+
+def add_spec_jobs(queue, spec_files, out_dir, quality=None):
+    from scene_spec import compile_cached
+
+    ids = []
+    for spec_file in spec_files:
+        # Спецификация проверяется при постановке, а не на воркере
+        name = compile_cached(spec_file)["name"]
+        options = job_options(name, out_dir, ROOT / "spec_scene.py", quality)
+        ids.append(queue.add(name, "spec", {"spec": str(Path(spec_file).absolute()), "options": options}))
+    return ids
+
+
+def add_segment_jobs(queue, file_path, scene_name, segments, out_dir, quality=None):
+    from segment_render import capture_timeline, split_timeline
+
+    name = f"{Path(file_path).stem}_{scene_name}"
+    options = job_options(name, out_dir, file_path, quality)
+    timeline = capture_timeline(file_path, scene_name, options=options)
+    payload = {"file": str(Path(file_path).absolute()), "scene": scene_name, "options": options}
+    ids = []
+    for start, end in split_timeline(timeline, segments):
+        # Свой каталог частичных файлов на сегмент: повторная попытка проверяет
+        # (drop_broken_partials) только свои файлы, а не те, что соседние
+        # воркеры еще дописывают; склейка берет пути из результатов сегментов
+        segment_options = {**options, "partial_movie_dir": str(Path(options["partial_movie_dir"]) / f"{start}_{end}")}
+        ids.append(queue.add(f"{name}[{start}:{end}]", "segment",
+                             {**payload, "options": segment_options, "start": start, "end": end}))
+    ids.append(queue.add(f"{name}[combine]", "combine", payload, depends_on=ids))
+    return ids
+
+
+def print_stats(stats):
+    depth = stats["depth"]
+    print(f"Очередь: в ожидании {depth['queued']}, в работе {depth['running']}, "
+          f"готово {depth['done']}, ошибок {depth['failed']}")
+    average = f", в среднем {stats['avg_job_seconds']:.1f} с на задачу" if stats["avg_job_seconds"] else ""
+    print(f"Пропускная способность: {stats['done_per_hour']:.1f} задач/ч за последний час{average}")
+    for worker in stats["workers"]:
+        state = "активен" if worker["active"] else "нет пульса"
+        job = f", задача #{worker['current_job']}" if worker["current_job"] else ""
+        print(f"  {worker['name']:<32} {state:<10} загрузка {100 * worker['utilization']:5.1f}%  "
+              f"готово {worker['jobs_done']}, ошибок {worker['jobs_failed']}{job}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Очередь рендера на SQLite")
+    parser.add_argument("--db", default=str(DEFAULT_DB))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    geometry = commands.add_parser("add-geometry", help="варианты GeometryProblem из CSV/JSON")
+    geometry.add_argument("jobs")
+    spec = commands.add_parser("add-spec", help="спецификации scene_spec")
+    spec.add_argument("specs", nargs="+")
+    segments = commands.add_parser("add-segments", help="одна сцена, разбитая на диапазоны анимаций")
+    segments.add_argument("file")
+    segments.add_argument("scene")
+    segments.add_argument("-n", "--segments", type=int, default=8)
+    for sub in (geometry, spec, segments):
+        sub.add_argument("--out-dir", default=str(DEFAULT_OUT_DIR))
+        sub.add_argument("-q", "--quality", default=None)
+
+    worker = commands.add_parser("worker", help="запустить локальный пул воркеров")
+    worker.add_argument("-j", "--processes", type=int, default=os.cpu_count() or 1)
+    worker.add_argument("--exit-when-empty", action="store_true")
+    status = commands.add_parser("status", help="глубина очереди, пропускная способность, загрузка")
+    status.add_argument("--json", action="store_true")
+    commands.add_parser("retry-failed", help="вернуть упавшие задачи в очередь")
+    args = parser.parse_args()
+
+    queue = RenderQueue(args.db)
+    if args.command == "add-geometry":
+        print(f"В очереди: {len(add_geometry_jobs(queue, args.jobs, args.out_dir, args.quality))} задач")
+    elif args.command == "add-spec":
+        print(f"В очереди: {len(add_spec_jobs(queue, args.specs, args.out_dir, args.quality))} задач")
+    elif args.command == "add-segments":
+        ids = add_segment_jobs(queue, args.file, args.scene, args.segments, args.out_dir, args.quality)
+        print(f"В очереди: {len(ids) - 1} сегментов и склейка")
+    elif args.command == "worker":
+        run_pool(args.db, args.processes, args.exit_when_empty)
+    elif args.command == "status":
+        stats = queue.stats()
+        if args.json:
+            print(json.dumps(stats, indent=2))
+        else:
+            print_stats(stats)
+    elif args.command == "retry-failed":
+        print(f"Возвращено в очередь: {queue.retry_failed()}")
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Запуск:
+# python render_queue.py add-geometry jobs.csv -q low_quality
+# python render_queue.py add-segments main.py GeometryProblem -n 8
+# python render_queue.py worker -j 8                 # на каждой машине фермы, база в общем media/
+# python render_queue.py status
@@ -0,0 +1,508 @@
+import argparse
+import ast
+import functools
+import hashlib
+import importlib.util
+import json
+import operator
+import os
+import re
+import string
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+import geometry
+
+# Разбор и проверка спецификаций задач без импорта manim: сотни файлов
+# проверяются и компилируются в план за миллисекунды, manim нужен только
+# для рендера (spec_scene.py)
+
+ROOT = Path(__file__).parent
+CACHE_DIR = ROOT / "media" / "cache" / "specs"
+# Меняется при изменении формата плана - старые записи кэша не подходят
+COMPILER_VERSION = 2
+
+DIRECTIONS = {
+    "U": (0, 1), "D": (0, -1), "L": (-1, 0), "R": (1, 0),
+    "UL": (-1, 1), "UR": (1, 1), "DL": (-1, -1), "DR": (1, -1),
+}
+OBJECT_TYPES = ("polygon", "segment", "dot", "label", "tex", "angle", "dashed", "tick", "group")
+TEXT_TYPES = ("label", "tex")
+STEP_ACTIONS = ("reveal", "hide", "rotate", "highlight", "transform", "wait")
+COLOR_PATTERN = re.compile(r"^(#[0-9A-Fa-f]{6}|[A-Z][A-Z0-9_]*)$")
+PARAM_PATTERN = re.compile(r"^\$(\w+)$")
+# Арифметика в derived: "2 * area / ef_length"
+OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Pow: operator.pow, ast.USub: operator.neg, ast.UAdd: operator.pos,
+}
+
+
+class SpecError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("\n".join(errors))
+
+
+def load_spec(path):
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise SpecError([f"{path}: для YAML нужен пакет PyYAML"]) from None
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+@functools.lru_cache(maxsize=None)
+def manim_color_names():
+    # Имена цветов читаются из исходника manim, без его импорта (секунды на
+    # каждый validate); manim не установлен - проверяется только форма имени
+    spec = importlib.util.find_spec("manim")
+    if spec is None or spec.origin is None:
+        return None
+    source = Path(spec.origin).parent / "utils" / "color" / "manim_colors.py"
+    try:
+        text = source.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    return frozenset(re.findall(r"^([A-Z][A-Z0-9_]*)\s*=\s*ManimColor\(", text, re.MULTILINE))
+
+
+# === ПОДСТАНОВКА ПАРАМЕТРОВ ===
+
+def format_number(value):
+    return f"{value:g}" if isinstance(value, (int, float)) else str(value)
+
+
+def substitute(value, params, errors, where, text=False):
+    # "$name" целиком - числовой параметр; в подписях $name подставляется в строку
+    if isinstance(value, dict):
+        return {key: substitute(item, params, errors, f"{where}.{key}", key in TEXT_TYPES)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, params, errors, f"{where}[{i}]") for i, item in enumerate(value)]
+    if isinstance(value, str):
+        if text:
+            return string.Template(value).safe_substitute({k: format_number(v) for k, v in params.items()})
+        match = PARAM_PATTERN.match(value)
+        if match:
+            if match.group(1) not in params:
+                errors.append(f"{where}: неизвестный параметр {value}")
+                return 0.0
+            return params[match.group(1)]
+    return value
+
+
+def evaluate(expression, params, where):
+    # Только числа, параметры и + - * / **: derived не может выполнить код
+    def walk(node):
+        if isinstance(node, ast.Expression):
+            return walk(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id not in params:
+                raise ValueError(f"неизвестный параметр {node.id}")
+            return params[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in OPERATORS:
+            return OPERATORS[type(node.op)](walk(node.left), walk(node.right))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in OPERATORS:
+            return OPERATORS[type(node.op)](walk(node.operand))
+        raise ValueError(f"недопустимое выражение {ast.unparse(node)!r}")
+
+    if isinstance(expression, bool) or not isinstance(expression, (str, int, float)):
+        raise ValueError(f"{where}: ожидается выражение, получено {expression!r}")
+    if not isinstance(expression, str):
+        return expression
+    try:
+        return float(walk(ast.parse(expression, mode="eval")))
+    except SyntaxError:
+        raise ValueError(f"{where}: не разобрано выражение {expression!r}") from None
+    except (ValueError, TypeError, ZeroDivisionError, OverflowError) as error:
+        raise ValueError(f"{where}: {error}") from None
+
+
+# === КОМПИЛЯЦИЯ ===
+
+class Compiler:
+    def __init__(self, spec, params=None):
+        self.errors = []
+        if not isinstance(spec, dict):
+            self.errors.append(f"spec: ожидается объект, получено {type(spec).__name__}")
+            spec = {}
+        spec_params = self.mapping(spec.get("params", {}), "params")
+        unknown = set(params or {}) - set(spec_params)
+        if unknown:
+            self.errors.append(f"params: неизвестные параметры {', '.join(sorted(unknown))}")
+        self.params = {**spec_params, **(params or {})}
+        # derived - величины, зависящие от параметров (ответ задачи): считаются
+        # после подстановки, переопределить их через params нельзя
+        for name, expression in self.mapping(spec.get("derived", {}), "derived").items():
+            try:
+                self.params[name] = evaluate(expression, self.params, f"derived.{name}")
+            except ValueError as error:
+                self.errors.append(str(error))
+                self.params[name] = 0.0
+        self.spec = substitute(spec, self.params, self.errors, "spec")
+        self.points = {}
+        self.objects = {}
+
+    def error(self, where, message):
+        self.errors.append(f"{where}: {message}")
+
+    def mapping(self, value, where):
+        if not isinstance(value, dict):
+            self.error(where, f"ожидается объект, получено {value!r}")
+            return {}
+        return value
+
+    def number(self, value, where):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            self.error(where, f"ожидается число, получено {value!r}")
+            return 0.0
+        return float(value)
+
+    def number_in(self, value, where, low, high=None):
+        number = self.number(value, where)
+        if number < low or (high is not None and number > high):
+            bounds = f"от {low:g} до {high:g}" if high is not None else f"не меньше {low:g}"
+            self.error(where, f"ожидается число {bounds}, получено {value!r}")
+        return number
+
+    def color(self, value, where):
+        names = manim_color_names()
+        if not isinstance(value, str) or not COLOR_PATTERN.match(value) or (
+                names is not None and not value.startswith("#") and value not in names):
+            self.error(where, f"цвет - имя manim (BLUE) или #RRGGBB, получено {value!r}")
+        return value
+
+    # --- точки ---
+
+    def point(self, ref, where, resolving=()):
+        if isinstance(ref, list):
+            coords = [self.number(item, f"{where}[{i}]") for i, item in enumerate(ref)]
+            if len(coords) not in (2, 3):
+                self.error(where, "точка задается как [x, y] или [x, y, z]")
+                return np.zeros(3)
+            return np.array((coords + [0.0])[:3])
+        if not isinstance(ref, str):
+            self.error(where, f"ожидается имя точки или координаты, получено {ref!r}")
+            return np.zeros(3)
+        if ref in self.points:
+            return self.points[ref]
+        definition = self.mapping(self.spec.get("points", {}), "points").get(ref)
+        if definition is None:
+            self.error(where, f"неизвестная точка {ref}")
+            return np.zeros(3)
+        if ref in resolving:
+            self.error(where, f"циклическое определение точки {ref}")
+            return np.zeros(3)
+
+        here = f"points.{ref}"
+        resolving = (*resolving, ref)
+        if isinstance(definition, list):
+            value = self.point(definition, here)
+        elif isinstance(definition, dict) and "between" in definition:
+            between = definition["between"]
+            if isinstance(between, list) and len(between) == 2:
+                start, end = (self.point(p, f"{here}.between[{i}]", resolving) for i, p in enumerate(between))
+                value = start + self.number(definition.get("ratio", 0.5), f"{here}.ratio") * (end - start)
+            else:
+                self.error(f"{here}.between", f"ожидается две точки, получено {between!r}")
+                value = np.zeros(3)
+        elif isinstance(definition, dict) and "rotate" in definition:
+            value = geometry.rotate_points(
+                self.point(definition["rotate"], f"{here}.rotate", resolving),
+                self.point(definition.get("about", [0, 0]), f"{here}.about", resolving),
+                np.radians(self.number(definition.get("angle", 0), f"{here}.angle")),
+            )
+        else:
+            self.error(here, "ожидается [x, y], {between, ratio} или {rotate, about, angle}")
+            value = np.zeros(3)
+        self.points[ref] = value
+        return value
+
+    def point_list(self, refs, where, minimum):
+        if not isinstance(refs, list) or len(refs) < minimum:
+            self.error(where, f"нужно не меньше {minimum} точек")
+            return []
+        return [self.point(ref, f"{where}[{i}]") for i, ref in enumerate(refs)]
+
+    # --- объекты ---
+
+    def object_ref(self, name, where):
+        if not isinstance(name, str):
+            self.error(where, f"ожидается имя объекта, получено {name!r}")
+            return False
+        if name not in self.objects:
+            self.error(where, f"объект {name!r} не определен выше")
+            return False
+        return True
+
+    def compile_object(self, name, definition):
+        where = f"objects.{name}"
+        kinds = [kind for kind in OBJECT_TYPES if kind in definition]
+        if len(kinds) != 1:
+            self.error(where, f"нужен ровно один тип из {', '.join(OBJECT_TYPES)}")
+            return None
+        kind = kinds[0]
+        item = {"type": kind}
+        if "color" in definition:
+            item["color"] = self.color(definition["color"], f"{where}.color")
+        for key in ("stroke_width", "font_size", "radius", "buff"):
+            if key in definition:
+                item[key] = self.number(definition[key], f"{where}.{key}")
+        if "fill_opacity" in definition:
+            item["fill_opacity"] = self.number_in(definition["fill_opacity"], f"{where}.fill_opacity", 0, 1)
+
+        if kind == "polygon":
+            item["points"] = self.point_list(definition[kind], f"{where}.polygon", 3)
+        elif kind in ("segment", "tick"):
+            item["points"] = self.point_list(definition[kind], f"{where}.{kind}", 2)[:2]
+        elif kind == "dot":
+            item["points"] = [self.point(definition[kind], f"{where}.dot")]
+        elif kind == "angle":
+            # [P, V, Q]: дуга при вершине V от луча V->P к лучу V->Q
+            item["points"] = self.point_list(definition[kind], f"{where}.angle", 3)[:3]
+            item.setdefault("radius", 0.8)
+            if len(item["points"]) == 3:
+                # Луч нулевой длины: направление дуги не определено
+                start, vertex, end = item["points"]
+                if min(np.linalg.norm(start - vertex), np.linalg.norm(end - vertex)) < 1e-9:
+                    self.error(f"{where}.angle", "луч угла нулевой длины: точки совпадают с вершиной")
+                    item["points"] = []
+        elif kind == "dashed":
+            item["points"] = self.point_list(definition[kind], f"{where}.dashed", 2)
+            if item["points"] and max(np.linalg.norm(point - item["points"][0]) for point in item["points"]) < 1e-9:
+                # Ломаная нулевой длины: штрихи не построить (dashed.dash_points)
+                self.error(f"{where}.dashed", "все точки совпадают")
+            num_dashes = self.number_in(definition.get("num_dashes", 15), f"{where}.num_dashes", 1)
+            if num_dashes != int(num_dashes):
+                self.error(f"{where}.num_dashes", f"ожидается целое число, получено {num_dashes:g}")
+            item["num_dashes"] = max(int(num_dashes), 1)
+            item["closed"] = bool(definition.get("closed", True))
+        elif kind == "group":
+            members = definition[kind]
+            if not isinstance(members, list):
+                self.error(f"{where}.group", "ожидается список объектов")
+                members = []
+            item["members"] = [member for member in members if self.object_ref(member, f"{where}.group")]
+        else:
+            if not isinstance(definition[kind], str):
+                self.error(f"{where}.{kind}", "ожидается строка")
+            item["text"] = str(definition[kind])
+            item["placement"] = self.placement(definition, where)
+        return item
+
+    def placement(self, definition, where):
+        direction = definition.get("direction")
+        if direction is not None and direction not in DIRECTIONS:
+            self.error(f"{where}.direction", f"ожидается одно из {', '.join(DIRECTIONS)}")
+            direction = None
+        offset = list(DIRECTIONS[direction]) + [0] if direction else None
+        if "on_angle" in definition:
+            name = definition["on_angle"]
+            if self.object_ref(name, f"{where}.on_angle") and self.objects[name]["type"] != "angle":
+                self.error(f"{where}.on_angle", f"{name} - не угол")
+            return {"kind": "on_angle", "object": name}
+        if "next_to" in definition:
+            self.object_ref(definition["next_to"], f"{where}.next_to")
+            return {"kind": "next_to", "object": definition["next_to"], "direction": offset or [0, -1, 0]}
+        if "at" in definition:
+            return {"kind": "at", "point": self.point(definition["at"], f"{where}.at").tolist(), "direction": offset}
+        self.error(where, "нужно положение: at, next_to или on_angle")
+        return {"kind": "at", "point": [0.0, 0.0, 0.0], "direction": None}
+
+    def compute_geometry(self):
+        # Все дуги, подписи на биссектрисах и риски - одним пакетом
+        angles = [item for item in self.objects.values() if item["type"] == "angle" and len(item["points"]) == 3]
+        if angles:
+            triples = np.array([item["points"] for item in angles])
+            starts, sweeps = geometry.arc_angles(triples[:, 1], triples[:, 0], triples[:, 2])
+            radii = np.array([item["radius"] for item in angles])
+            labels = geometry.bisector_points(triples[:, 1], radii + 0.3, starts, sweeps)
+            for item, start, sweep, label in zip(angles, starts, sweeps, labels):
+                item.update(start_angle=float(start), sweep=float(sweep), label_position=label.tolist())
+        ticks = [item for item in self.objects.values() if item["type"] == "tick" and len(item["points"]) == 2]
+        if ticks:
+            pairs = np.array([item["points"] for item in ticks])
+            ends = geometry.tick_marks(pairs[:, 0], pairs[:, 1], half_length=0.15)
+            for item, tick in zip(ticks, ends):
+                item["points"] = tick
+        for item in self.objects.values():
+            if "points" in item:
+                item["points"] = [np.asarray(point).tolist() for point in item["points"]]
+
+    # --- шаги ---
+
+    def compile_step(self, index, step):
+        where = f"steps[{index}]"
+        if not isinstance(step, dict) or not any(action in step for action in STEP_ACTIONS):
+            self.error(where, f"шаг - объект с действиями из {', '.join(STEP_ACTIONS)}")
+            return None
+        unknown = set(step) - set(STEP_ACTIONS) - {"run_time"}
+        if unknown:
+            self.error(where, f"неизвестные ключи {', '.join(sorted(unknown))}")
+        result = {}
+        for action in ("reveal", "hide"):
+            if action in step:
+                names = step[action] if isinstance(step[action], list) else [step[action]]
+                result[action] = [name for name in names if self.object_ref(name, f"{where}.{action}")]
+        if "rotate" in step:
+            rotate = self.mapping(step["rotate"], f"{where}.rotate")
+            self.object_ref(rotate.get("object"), f"{where}.rotate.object")
+            result["rotate"] = {
+                "object": rotate.get("object"),
+                "about": self.point(rotate.get("about", [0, 0]), f"{where}.rotate.about").tolist(),
+                "angle": float(np.radians(self.number(rotate.get("angle", 0), f"{where}.rotate.angle"))),
+            }
+        if "highlight" in step:
+            highlight = self.mapping(step["highlight"], f"{where}.highlight")
+            names = highlight.get("objects", [])
+            if not isinstance(names, list):
+                self.error(f"{where}.highlight.objects", "ожидается список объектов")
+                names = []
+            result["highlight"] = {"objects": [n for n in names if self.object_ref(n, f"{where}.highlight")]}
+            if "opacity" not in highlight and "color" not in highlight:
+                self.error(f"{where}.highlight", "нужен opacity или color")
+            if "opacity" in highlight:
+                result["highlight"]["opacity"] = self.number_in(highlight["opacity"], f"{where}.highlight.opacity", 0, 1)
+            if "color" in highlight:
+                result["highlight"]["color"] = self.color(highlight["color"], f"{where}.highlight.color")
+        if "transform" in step:
+            transform = self.mapping(step["transform"], f"{where}.transform")
+            source, target = transform.get("from"), transform.get("to")
+            self.object_ref(source, f"{where}.transform.from")
+            self.object_ref(target, f"{where}.transform.to")
+            if isinstance(source, str) and source == target:
+                self.error(f"{where}.transform", f"from и to - один и тот же объект {source}")
+            result["transform"] = {"from": source, "to": target}
+        if "wait" in step:
+            if len(step) > 1:
+                self.error(where, "wait не совмещается с другими действиями")
+            result["wait"] = self.number_in(step["wait"], f"{where}.wait", 0)
+        if "run_time" in step:
+            result["run_time"] = self.number_in(step["run_time"], f"{where}.run_time", 0)
+        return result
+
+    def compile(self):
+        spec = self.spec
+        frame = spec.get("frame", [24.5, 14])
+        if not isinstance(frame, list) or len(frame) != 2:
+            self.error("frame", f"ожидается [ширина, высота], получено {frame!r}")
+            frame = [24.5, 14]
+        frame = [self.number(value, "frame") for value in frame]
+        background = self.color(spec.get("background", "BLACK"), "background")
+        for name, definition in self.mapping(spec.get("objects", {}), "objects").items():
+            if not isinstance(definition, dict):
+                self.error(f"objects.{name}", "ожидается объект")
+                continue
+            item = self.compile_object(name, definition)
+            if item is not None:
+                self.objects[name] = item
+        self.compute_geometry()
+        steps = spec.get("steps", [])
+        if not isinstance(steps, list):
+            self.error("steps", "ожидается список шагов")
+            steps = []
+        steps = [self.compile_step(i, step) for i, step in enumerate(steps)]
+        if not steps:
+            self.error("steps", "нет ни одного шага")
+        if self.errors:
+            raise SpecError(self.errors)
+        return {
+            "name": spec.get("name", "SpecScene"),
+            "frame": frame,
+            "background": background,
+            "objects": self.objects,
+            "steps": [step for step in steps if step is not None],
+        }
+
+
+def compile_spec(spec, params=None):
+    return Compiler(spec, params).compile()
+
+
+# === КЭШ ПЛАНОВ ===
+
+_plans = {}
+
+
+def compile_cached(path, params=None, cache_dir=CACHE_DIR):
+    # Ключ - содержимое спецификации и параметры, а не путь: переименование
+    # файла кэш не сбрасывает, правка - сбрасывает
+    raw = Path(path).read_bytes()
+    key = hashlib.sha256(json.dumps(
+        [COMPILER_VERSION, raw.decode("utf-8"), params or {}], sort_keys=True
+    ).encode("utf-8")).hexdigest()
+    if key in _plans:
+        return _plans[key]
+
+    cache_path = Path(cache_dir) / key[:2] / f"{key}.json"
+    try:
+        plan = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        plan = compile_spec(load_spec(path), params)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(plan, f)
+        os.replace(tmp_name, cache_path)
+    _plans[key] = plan
+    return plan
+
+
+# === CLI ===
+
+def validate(paths):
+    failed = 0
+    for path in paths:
+        start = time.perf_counter()
+        try:
+            plan = compile_spec(load_spec(path))
+        except (SpecError, ValueError, OSError) as error:
+            failed += 1
+            print(f"{path}: ОШИБКА")
+            for line in str(error).splitlines():
+                print(f"  {line}")
+            continue
+        milliseconds = 1000 * (time.perf_counter() - start)
+        print(f"{path}: OK ({len(plan['objects'])} объектов, {len(plan['steps'])} шагов, {milliseconds:.1f} мс)")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Декларативные спецификации задач")
+    commands = parser.add_subparsers(dest="command", required=True)
+    validate_parser = commands.add_parser("validate", help="проверить спецификации без manim")
+    validate_parser.add_argument("specs", nargs="+")
+    render_parser = commands.add_parser("render", help="отрендерить спецификацию")
+    render_parser.add_argument("spec")
+    render_parser.add_argument("--params", default=None, help='JSON, например \'{"e_ratio": 0.3}\'')
+    render_parser.add_argument("-q", "--quality", default=None)
+    args = parser.parse_args()
+
+    if args.command == "validate":
+        sys.exit(1 if validate(args.specs) else 0)
+
+    from spec_scene import render_spec
+
+    render_spec(args.spec, json.loads(args.params) if args.params else None, args.quality)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Запуск:
+# python scene_spec.py validate specs/*.json
+# python scene_spec.py render specs/square_rotation.json -q low_quality
+# SCENE_SPEC=specs/square_rotation.json manim -pql spec_scene.py SpecScene
@@ -0,0 +1,190 @@
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from manim import tempconfig
+from manim.renderer.cairo_renderer import CairoRenderer
+from manim.scene.scene_file_writer import SceneFileWriter
+from manim.utils.exceptions import EndSceneEarlyException
+
+# Статичные wait() почти ничего не стоят при растеризации, только кодирование
+WAIT_WEIGHT = 0.2
+
+
+def load_scene_class(file_path, scene_name):
+    # Загружаем модуль заново, чтобы его настройки config (frame_rate = 60)
+    # применились поверх текущего tempconfig, как при запуске через manim CLI
+    file_path = Path(file_path).absolute()
+    if str(file_path.parent) not in sys.path:
+        sys.path.insert(0, str(file_path.parent))
+    spec = importlib.util.spec_from_file_location(file_path.stem, file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, scene_name)
+
+
+def render_options(file_path, quality=None):
+    options = {"input_file": str(Path(file_path).absolute()), "preview": False, "progress_bar": "none"}
+    if quality:
+        options["quality"] = quality
+    return options
+
+
+# === ЗАХВАТ ТАЙМЛАЙНА ===
+
+class TimelineRenderer(CairoRenderer):
+    # Проигрывает сцену без растеризации и записи, запоминая каждый play()/wait()
+    def __init__(self, **kwargs):
+        super().__init__(skip_animations=True, **kwargs)
+        self.timeline = []
+
+    def play(self, scene, *args, **kwargs):
+        super().play(scene, *args, **kwargs)
+        self.timeline.append({
+            "index": len(self.timeline),
+            "duration": scene.duration,
+            "wait": scene.is_current_animation_frozen_frame(),
+        })
+
+    def update_frame(self, *args, **kwargs):
+        pass
+
+
+def capture_timeline(file_path, scene_name, scene_kwargs=None, options=None):
+    with tempconfig({**(options or {}), "dry_run": True}):
+        scene_class = load_scene_class(file_path, scene_name)
+        renderer = TimelineRenderer()
+        scene = scene_class(renderer=renderer, **(scene_kwargs or {}))
+        scene.render()
+    return renderer.timeline
+
+
+def split_timeline(timeline, segments):
+    # Делим последовательность анимаций на непрерывные диапазоны примерно
+    # равной стоимости (по числу кадров, wait() дешевле)
+    weights = [item["duration"] * (WAIT_WEIGHT if item["wait"] else 1.0) for item in timeline]
+    target = sum(weights) / max(segments, 1)
+
+    ranges = []
+    start = 0
+    accumulated = 0.0
+    for index, weight in enumerate(weights):
+        accumulated += weight
+        is_last = index + 1 == len(weights)
+        if not is_last and len(ranges) < segments - 1 and accumulated >= target * (len(ranges) + 1):
+            ranges.append((start, index + 1))
+            start = index + 1
+    if start < len(weights):
+        ranges.append((start, len(weights)))
+    return ranges
+
+
+# === РЕНДЕР ДИАПАЗОНА АНИМАЦИЙ ===
+
+class SegmentFileWriter(SceneFileWriter):
+    # Пишет только частичные файлы своего диапазона: склейку и очистку кэша
+    # делает главный процесс, иначе воркеры мешали бы друг другу
+    def finish(self):
+        pass
+
+
+class SegmentRenderer(CairoRenderer):
+    # Конец диапазона проверяем сами, а не через upto_animation_number:
+    # для диапазона (0, 1) пришлось бы передать 0, а это "без ограничения"
+    def __init__(self, end, **kwargs):
+        super().__init__(**kwargs)
+        self.segment_end = end
+
+    def update_skipping_status(self):
+        super().update_skipping_status()
+        if self.num_plays >= self.segment_end:
+            self.skip_animations = True
+            raise EndSceneEarlyException()
+
+
+def render_segment(file_path, scene_name, start, end, scene_kwargs=None, options=None):
+    begin = time.perf_counter()
+    segment_options = {**(options or {}), "from_animation_number": start}
+    with tempconfig(segment_options):
+        scene_class = load_scene_class(file_path, scene_name)
+        renderer = SegmentRenderer(end, file_writer_class=SegmentFileWriter)
+        scene = scene_class(renderer=renderer, **(scene_kwargs or {}))
+        scene.render()
+    files = renderer.file_writer.partial_movie_files[start:end]
+    return {"start": start, "end": end, "files": files, "seconds": time.perf_counter() - begin}
+
+
+def combine_segments(file_path, scene_name, segments, options=None):
+    files = [path for segment in sorted(segments, key=lambda s: s["start"]) for path in segment["files"]]
+    missing = [path for path in files if path is None or not Path(path).exists()]
+    if missing:
+        raise RuntimeError(f"Не найдены частичные файлы: {missing}")
+
+    with tempconfig(options or {}):
+        load_scene_class(file_path, scene_name)
+        writer = SceneFileWriter(CairoRenderer(), scene_name)
+        writer.combine_files(files, writer.movie_file_path)
+        writer.print_file_ready_message(writer.movie_file_path)
+        return writer.movie_file_path
+
+
+def render_parallel(file_path, scene_name, workers=None, quality=None, scene_kwargs=None):
+    workers = workers or os.cpu_count() or 1
+    options = render_options(file_path, quality)
+
+    start = time.perf_counter()
+    timeline = capture_timeline(file_path, scene_name, scene_kwargs, options)
+    if not timeline:
+        # Ни одного play()/wait(): делить нечего, сцена рендерится здесь же,
+        # и manim сохраняет последний кадр картинкой
+        with tempconfig(options):
+            scene = load_scene_class(file_path, scene_name)(**(scene_kwargs or {}))
+            scene.render()
+        print("Анимаций: 0, сцена отрендерена без сегментов")
+        return scene.renderer.file_writer.image_file_path
+
+    ranges = split_timeline(timeline, workers)
+    captured = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [
+            pool.submit(render_segment, file_path, scene_name, a, b, scene_kwargs, options)
+            for a, b in ranges
+        ]
+        segments = [future.result() for future in futures]
+    rendered = time.perf_counter()
+
+    output = combine_segments(file_path, scene_name, segments, options)
+    finished = time.perf_counter()
+
+    print(f"Анимаций: {len(timeline)}, сегментов: {len(ranges)}")
+    for segment in segments:
+        print(f"  [{segment['start']:3d}, {segment['end']:3d}) {segment['seconds']:.1f} с")
+    print(f"Таймлайн: {captured - start:.1f} с, рендер: {rendered - captured:.1f} с, "
+          f"склейка: {finished - rendered:.1f} с")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Параллельный рендер одной сцены по диапазонам анимаций")
+    parser.add_argument("file", help="файл со сценой, например main.py")
+    parser.add_argument("scene", help="имя класса сцены, например GeometryProblem")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="число сегментов/процессов")
+    parser.add_argument("-q", "--quality", default=None,
+                        help="качество manim: low_quality, medium_quality, high_quality, ...")
+    args = parser.parse_args()
+
+    render_parallel(args.file, args.scene, args.workers, args.quality)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# Запуск:
+# python segment_render.py main.py GeometryProblem -j 8 -q low_quality
+# Частичные файлы пишутся в обычный partial_movie_files, итог - как у manim CLI
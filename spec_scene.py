@@ -0,0 +1,145 @@
+import os
+
+from manim import *
+import manim
+import numpy as np
+
+from batched_style import BatchedStyle
+from dashed import DashedPolyline
+import glyph_atlas
+import render_modes
+import scene_spec
+import tex_cache
+
+config.frame_rate = 60
+
+tex_cache.install()
+
+
+def parse_color(value):
+    return ManimColor(value) if value.startswith("#") else getattr(manim, value)
+
+
+# === ОБЪЕКТЫ ПЛАНА ===
+
+def build_mobject(item, built):
+    kind = item["type"]
+    color = parse_color(item.get("color", "WHITE"))
+    stroke_width = item.get("stroke_width", 4)
+    points = [np.array(point) for point in item.get("points", [])]
+
+    if kind == "polygon":
+        return Polygon(*points, color=color, stroke_width=stroke_width,
+                       fill_color=color, fill_opacity=item.get("fill_opacity", 0))
+    if kind == "segment":
+        return Line(*points, color=color, stroke_width=stroke_width)
+    if kind == "tick":
+        return Line(*points, color=parse_color(item.get("color", "YELLOW")), stroke_width=item.get("stroke_width", 3))
+    if kind == "dot":
+        return Dot(points[0], color=color, radius=item.get("radius", 0.08))
+    if kind == "angle":
+        return Arc(radius=item["radius"], start_angle=item["start_angle"], angle=item["sweep"],
+                   color=color, stroke_width=stroke_width).move_arc_center_to(points[1])
+    if kind == "dashed":
+        return DashedPolyline(*points, num_dashes=item["num_dashes"], closed=item["closed"],
+                              color=color, stroke_width=stroke_width)
+    if kind == "group":
+        return VGroup(*[built[name] for name in item["members"]])
+
+    if kind == "label":
+        mob = glyph_atlas.text(item["text"], font_size=item.get("font_size", 24), color=color)
+    else:
+        mob = glyph_atlas.tex(item["text"], font_size=item.get("font_size", 40), color=color)
+    place(mob, item["placement"], built, item.get("buff"))
+    return mob
+
+
+def place(mob, placement, built, buff):
+    kind = placement["kind"]
+    if kind == "on_angle":
+        # Позиция на биссектрисе уже посчитана при компиляции плана
+        mob.move_to(np.array(built.plan_items[placement["object"]]["label_position"]))
+    elif kind == "next_to":
+        mob.next_to(built[placement["object"]], np.array(placement["direction"]),
+                    buff=0.3 if buff is None else buff)
+    elif placement["direction"] is not None:
+        mob.next_to(np.array(placement["point"]), np.array(placement["direction"]),
+                    buff=0.15 if buff is None else buff)
+    else:
+        mob.move_to(np.array(placement["point"]))
+
+
+class BuiltObjects(dict):
+    def __init__(self, plan_items):
+        super().__init__()
+        self.plan_items = plan_items
+
+
+def reveal_animation(name, built):
+    item = built.plan_items[name]
+    if item["type"] == "group":
+        return AnimationGroup(*[reveal_animation(member, built) for member in item["members"]])
+    if item["type"] in scene_spec.TEXT_TYPES:
+        return Write(built[name])
+    return Create(built[name])
+
+
+def step_animations(step, built):
+    animations = [reveal_animation(name, built) for name in step.get("reveal", [])]
+    animations += [FadeOut(built[name]) for name in step.get("hide", [])]
+    if "rotate" in step:
+        rotate = step["rotate"]
+        animations.append(Rotate(built[rotate["object"]], angle=rotate["angle"], about_point=np.array(rotate["about"])))
+    if "transform" in step:
+        animations.append(Transform(built[step["transform"]["from"]], built[step["transform"]["to"]]))
+    if "highlight" in step:
+        highlight = step["highlight"]
+        group = VGroup(*[built[name] for name in highlight["objects"]])
+        if "opacity" in highlight:
+            animations.append(BatchedStyle(group, "set_opacity", highlight["opacity"]))
+        if "color" in highlight:
+            animations.append(BatchedStyle(group, "set_color", parse_color(highlight["color"])))
+    return animations
+
+
+# === СЦЕНА ===
+
+class SpecScene(Scene):
+    def __init__(self, spec_path=None, params=None, **kwargs):
+        # Режимы рендера из manim.cfg, как у GeometryProblem
+        if kwargs.get("renderer") is None and config.renderer == RendererType.CAIRO:
+            kwargs["renderer"] = render_modes.make_renderer(skip_animations=kwargs.get("skip_animations", False))
+        super().__init__(**kwargs)
+        spec_path = spec_path or os.environ.get("SCENE_SPEC")
+        if not spec_path:
+            raise ValueError("Не задана спецификация: spec_path или переменная окружения SCENE_SPEC")
+        self.plan = scene_spec.compile_cached(spec_path, params)
+        self.camera.frame_width, self.camera.frame_height = self.plan["frame"]
+
+    def construct(self):
+        self.camera.background_color = parse_color(self.plan["background"])
+        built = BuiltObjects(self.plan["objects"])
+        for name, item in self.plan["objects"].items():
+            built[name] = build_mobject(item, built)
+
+        for step in self.plan["steps"]:
+            if "wait" in step:
+                self.wait(step["wait"])
+                continue
+            kwargs = {"run_time": step["run_time"]} if "run_time" in step else {}
+            self.play(*step_animations(step, built), **kwargs)
+
+
+def render_spec(spec_path, params=None, quality=None):
+    plan = scene_spec.compile_cached(spec_path, params)
+    options = {"output_file": plan["name"], "preview": False, "progress_bar": "none"}
+    if quality:
+        options["quality"] = quality
+    with tempconfig(options):
+        scene = SpecScene(spec_path=spec_path, params=params)
+        scene.render()
+        return scene.renderer.file_writer.movie_file_path
+
+
+# Для рендеринга используйте:
+# SCENE_SPEC=specs/square_rotation.json manim -pql spec_scene.py SpecScene
@@ -0,0 +1,187 @@
+import hashlib
+from collections import Counter, OrderedDict
+
+import numpy as np
+from manim import logger
+from manim.mobject.types.vectorized_mobject import VMobject
+from manim.utils.family import extract_mobject_family_members
+from manim.utils.iterables import list_update
+
+# Больше слоев поверх движущихся объектов - дороже композитинг, чем растеризация
+MAX_OVERLAYS = 4
+LAYER_CACHE_SIZE = 8
+
+STYLE_ARRAYS = ("points", "fill_rgbas", "stroke_rgbas", "background_stroke_rgbas")
+STYLE_VALUES = ("stroke_width", "background_stroke_width", "z_index", "joint_type",
+                "cap_style", "sheen_factor", "shade_in_3d")
+
+
+def moving_family_ids(scene):
+    # Движутся семейства мобджектов анимаций, объекты с апдейтерами и foreground
+    moving = [animation.mobject for animation in scene.animations or [] if animation.mobject is not None]
+    for mob in list_update(scene.mobjects, scene.foreground_mobjects):
+        if mob.get_family_updaters() or mob in scene.foreground_mobjects:
+            moving.append(mob)
+    return {id(member) for mob in moving for member in mob.get_family()}
+
+
+def split_runs(scene, use_z_index):
+    # Порядок отрисовки как у камеры, разбитый на чередующиеся
+    # неподвижные и движущиеся участки
+    moving_ids = moving_family_ids(scene)
+    members = extract_mobject_family_members(
+        list_update(scene.mobjects, scene.foreground_mobjects),
+        use_z_index=use_z_index,
+    )
+    runs = []
+    for mob in members:
+        kind = "moving" if id(mob) in moving_ids else "static"
+        if kind == "static" and not mob.has_points():
+            continue
+        if runs and runs[-1][0] == kind:
+            runs[-1][1].append(mob)
+        else:
+            runs.append((kind, [mob]))
+    return runs
+
+
+def composite(frame, layer):
+    # Наложение premultiplied RGBA (формат cairo) только в пределах рамки слоя
+    y0, x0 = layer["origin"]
+    rgba = layer["rgba"]
+    region = frame[y0:y0 + rgba.shape[0], x0:x0 + rgba.shape[1]]
+    region[...] = rgba + (region * layer["inverse_alpha"] + 127) // 255
+
+
+def layer_key(camera, mobjects, background=False):
+    # Ключ слоя - состояние его мобджектов: смена прозрачности, цвета
+    # или положения дает новый ключ
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr((
+        background, camera.pixel_width, camera.pixel_height, camera.frame_width,
+        camera.frame_height, tuple(camera.frame_center),
+    )).encode())
+    if background:
+        hasher.update(camera.background.tobytes())
+    for mob in mobjects:
+        if not isinstance(mob, VMobject):
+            return None
+        hasher.update(type(mob).__name__.encode())
+        for name in STYLE_ARRAYS:
+            hasher.update(np.ascontiguousarray(getattr(mob, name, ())).tobytes())
+        hasher.update(repr([getattr(mob, name, None) for name in STYLE_VALUES]).encode())
+    return hasher.digest()
+
+
+def crop_layer(pixel_array):
+    # Обрезка растеризованного на прозрачном фоне слоя по непрозрачным пикселям
+    alpha = pixel_array[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    cols = np.flatnonzero(alpha.any(axis=0))
+    if not len(rows):
+        return None
+    rgba = pixel_array[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1].copy()
+    return {
+        "origin": (rows[0], cols[0]),
+        "rgba": rgba,
+        "inverse_alpha": 255 - rgba[..., 3:4].astype(np.uint16),
+    }
+
+
+class StaticLayerMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.layer_plan = None
+        self.layer_cache = OrderedDict()
+        self.layer_stats = Counter()
+
+    # === ПОСТРОЕНИЕ СЛОЕВ ===
+
+    def cached_layer(self, mobjects, background):
+        key = layer_key(self.camera, mobjects, background)
+        if key is not None and key in self.layer_cache:
+            self.layer_cache.move_to_end(key)
+            self.layer_stats["hits"] += 1
+            return self.layer_cache[key]
+
+        self.layer_stats["misses"] += 1
+        layer = self.rasterize_layer(mobjects, background)
+        if key is not None:
+            self.layer_cache[key] = layer
+            while len(self.layer_cache) > LAYER_CACHE_SIZE:
+                self.layer_cache.popitem(last=False)
+        return layer
+
+    def rasterize_layer(self, mobjects, background):
+        camera = self.camera
+        if background:
+            camera.reset()
+        else:
+            camera.pixel_array[...] = 0
+        camera.capture_mobjects(mobjects, include_submobjects=False)
+        if background:
+            return camera.pixel_array.copy()
+        return crop_layer(camera.pixel_array)
+
+    def save_static_frame_data(self, scene, static_mobjects):
+        self.layer_plan = None
+        if self.skip_animations:
+            return super().save_static_frame_data(scene, static_mobjects)
+
+        runs = split_runs(scene, self.camera.use_z_index)
+        overlays = sum(kind == "static" for kind, _ in runs[1:])
+        if overlays > MAX_OVERLAYS:
+            return super().save_static_frame_data(scene, static_mobjects)
+
+        self.static_image = None
+        if runs and runs[0][0] == "static":
+            self.static_image = self.cached_layer(runs.pop(0)[1], background=True)
+
+        plan = []
+        for kind, mobjects in runs:
+            if kind == "moving":
+                plan.append((kind, mobjects))
+            else:
+                layer = self.cached_layer(mobjects, background=False)
+                if layer is not None:
+                    plan.append((kind, layer))
+        self.layer_plan = plan
+        return self.static_image
+
+    # === ОТРИСОВКА КАДРА ===
+
+    def draw_layers(self):
+        camera = self.camera
+        if self.static_image is not None:
+            camera.set_frame_to_background(self.static_image)
+        else:
+            camera.reset()
+        for kind, item in self.layer_plan:
+            if kind == "moving":
+                camera.capture_mobjects([mob for mob in item if mob.has_points()], include_submobjects=False)
+            else:
+                composite(camera.pixel_array, item)
+
+    def update_frame(self, scene, *args, **kwargs):
+        if self.layer_plan is None:
+            return super().update_frame(scene, *args, **kwargs)
+        self.draw_layers()
+
+    def render(self, scene, time, moving_mobjects):
+        if self.layer_plan is None:
+            return super().render(scene, time, moving_mobjects)
+        self.draw_layers()
+        self.add_frame(self.get_frame())
+
+    def play(self, scene, *args, **kwargs):
+        try:
+            super().play(scene, *args, **kwargs)
+        finally:
+            # План действителен только внутри одного play()
+            self.layer_plan = None
+
+    def scene_finished(self, scene):
+        super().scene_finished(scene)
+        if self.layer_stats:
+            logger.info(f"static_layers: слоев из кэша {self.layer_stats['hits']}, "
+                        f"растеризовано {self.layer_stats['misses']}")
@@ -0,0 +1,246 @@
+import collections
+import concurrent.futures
+import configparser
+import functools
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+from manim import logger
+from manim.scene.scene_file_writer import SceneFileWriter
+from manim.utils.file_ops import write_to_movie
+from manim.utils.iterables import list_update
+
+CONFIG_FILE = Path(__file__).with_name("manim.cfg")
+
+# Дольше этого кодировщик не забирает кадры - значит, поток записи умер
+STALL_TIMEOUT = 60
+
+
+def read_settings(config_file=CONFIG_FILE):
+    parser = configparser.ConfigParser()
+    parser.read(config_file, encoding="utf-8")
+    section = parser["streaming"] if parser.has_section("streaming") else {}
+    return {
+        "max_frames": int(section.get("max_frames", "8")),
+        "max_memory_mb": float(section.get("max_memory_mb", "256")),
+        "producers": int(section.get("producers", "2")),
+    }
+
+
+# === КОЛЬЦЕВОЙ БУФЕР КАДРОВ ===
+
+class FrameRing:
+    # Переиспользуемые массивы кадров между рендером и кодировщиком.
+    # Когда все слоты в очереди на кодирование, acquire() ждет - это и есть
+    # обратное давление: рендер не убегает вперед и память не растет
+    def __init__(self, max_frames, max_bytes):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.slots = 0
+        self.shape = None
+        self.owned = set()
+        self.free = queue.Queue()
+        self.lock = threading.Lock()
+        self.waits = 0
+
+    def capacity(self, frame_bytes):
+        return max(2, min(self.max_frames, int(self.max_bytes // frame_bytes)))
+
+    def acquire(self, shape, dtype):
+        if self.shape not in (None, (shape, dtype)):
+            # Другой размер кадра - кольцо ему не подходит
+            return np.empty(shape, dtype)
+        try:
+            return self.free.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            self.shape = (shape, dtype)
+            if self.slots < self.capacity(np.prod(shape) * np.dtype(dtype).itemsize):
+                self.slots += 1
+                frame = np.empty(shape, dtype)
+                self.owned.add(id(frame))
+                return frame
+        self.waits += 1
+        try:
+            return self.free.get(timeout=STALL_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError("Кодировщик не забирает кадры из буфера") from None
+
+    def release(self, frame):
+        if id(frame) in self.owned:
+            self.free.put(frame)
+
+
+# === РАСТЕРИЗАЦИЯ В ПОТОКАХ ===
+
+def snapshot(mobjects):
+    # Неглубокие копии всего семейства со своими массивами: сцена может
+    # двигать мобджекты дальше, пока поток рисует этот кадр
+    clones = {}
+
+    def clone(mobject):
+        if id(mobject) not in clones:
+            # Как Mobject.__deepcopy__, но массивы копируются, а остальное - по ссылке
+            result = type(mobject).__new__(type(mobject))
+            for key, value in vars(mobject).items():
+                setattr(result, key, value.copy() if isinstance(value, np.ndarray) else value)
+            clones[id(mobject)] = result
+            result.submobjects = [clone(sub) for sub in mobject.submobjects]
+        return clones[id(mobject)]
+
+    return [clone(mobject) for mobject in mobjects]
+
+
+def sync_camera(camera, main_camera):
+    # Сцена меняет кадр и фон основной камеры (GeometryProblem: 24.5x14)
+    camera.frame_width = main_camera.frame_width
+    camera.frame_height = main_camera.frame_height
+    camera.frame_center = main_camera.frame_center
+    camera.use_z_index = main_camera.use_z_index
+    if (camera.background_color, camera.background_opacity) != (
+            main_camera.background_color, main_camera.background_opacity):
+        camera.background_color = main_camera.background_color
+        camera.background_opacity = main_camera.background_opacity
+
+
+def rasterize(camera, static_image, mobjects, capture_kwargs, frame):
+    if static_image is not None:
+        camera.set_frame_to_background(static_image)
+    else:
+        camera.reset()
+    camera.capture_mobjects(mobjects, **capture_kwargs)
+    np.copyto(frame, camera.pixel_array)
+    return frame
+
+
+# === ЗАПИСЬ ===
+
+@functools.lru_cache(maxsize=None)
+def streaming_writer(base):
+    class StreamingFileWriter(base):
+        # Слот возвращается в кольцо, как только поток записи его закодировал
+        def end_animation(self, allow_write=False):
+            # Недорисованные кадры анимации - в ее файл, до закрытия потока
+            self.renderer.write_pending()
+            super().end_animation(allow_write)
+
+        def encode_and_write_frame(self, frame, num_frames):
+            try:
+                super().encode_and_write_frame(frame, num_frames)
+            finally:
+                self.renderer.frame_ring.release(frame)
+
+        def write_frame(self, frame, num_frames=1):
+            super().write_frame(frame, num_frames)
+            if not write_to_movie():
+                # PNG пишется синхронно, в очередь кадр не попал
+                self.renderer.frame_ring.release(frame)
+
+    return StreamingFileWriter
+
+
+class StreamingMixin:
+    # Кадры анимаций растеризуются в потоках-производителях (у каждого своя
+    # камера) прямо в слоты кольца, поток записи кодирует готовые, пока
+    # рисуются следующие; число потоков и объем ограничены [streaming]
+    def __init__(self, *args, **kwargs):
+        kwargs["file_writer_class"] = streaming_writer(kwargs.get("file_writer_class", SceneFileWriter))
+        settings = read_settings()
+        self.frame_ring = FrameRing(settings["max_frames"], settings["max_memory_mb"] * 1024 * 1024)
+        self.producer_count = max(settings["producers"], 0)
+        self.producer_pool = None
+        self.producer_cameras = queue.Queue()
+        self.pending = collections.deque()
+        self.frame_job = None
+        self.ring_frames = False
+        super().__init__(*args, **kwargs)
+
+    def render(self, scene, time, moving_mobjects):
+        # Из кольца берутся только кадры, ушедшие в add_frame из render();
+        # static_image и замороженные кадры живут дольше и копируются как обычно
+        self.ring_frames = not self.skip_animations
+        try:
+            super().render(scene, time, moving_mobjects)
+        finally:
+            self.ring_frames = False
+            self.frame_job = None
+
+    def update_frame(self, scene, mobjects=None, include_submobjects=True, ignore_skipping=True, **kwargs):
+        if not (self.ring_frames and self.producer_count):
+            return super().update_frame(scene, mobjects, include_submobjects, ignore_skipping, **kwargs)
+        # Кадр из render(): состояние сцены уже посчитано, основной поток
+        # только снимает копию, рисует ее производитель (static_layers
+        # рисует слои сам и сюда не заходит)
+        if not mobjects:
+            mobjects = list_update(scene.mobjects, scene.foreground_mobjects)
+        kwargs["include_submobjects"] = include_submobjects
+        self.frame_job = (self.static_image, snapshot(mobjects), kwargs)
+
+    def producer_camera(self):
+        try:
+            camera = self.producer_cameras.get_nowait()
+        except queue.Empty:
+            camera = type(self.camera)()
+        sync_camera(camera, self.camera)
+        return camera
+
+    def produce(self, camera, *args):
+        try:
+            return rasterize(camera, *args)
+        finally:
+            self.producer_cameras.put(camera)
+
+    def get_frame(self):
+        if not self.ring_frames:
+            return super().get_frame()
+        pixel_array = self.camera.pixel_array
+        if self.frame_job is None:
+            frame = self.frame_ring.acquire(pixel_array.shape, pixel_array.dtype)
+            np.copyto(frame, pixel_array)
+            return frame
+        # Ждущие записи кадры держат слоты: их меньше емкости кольца, иначе
+        # acquire() ждал бы слот, который освободится только после записи
+        frame_bytes = pixel_array.nbytes
+        limit = min(2 * self.producer_count, self.frame_ring.capacity(frame_bytes) - 1)
+        while len(self.pending) >= limit:
+            self.write_pending(1)
+        frame = self.frame_ring.acquire(pixel_array.shape, pixel_array.dtype)
+        if self.producer_pool is None:
+            self.producer_pool = concurrent.futures.ThreadPoolExecutor(
+                self.producer_count, thread_name_prefix="streaming")
+        static_image, mobjects, capture_kwargs = self.frame_job
+        self.frame_job = None
+        return self.producer_pool.submit(
+            self.produce, self.producer_camera(), static_image, mobjects, capture_kwargs, frame)
+
+    def add_frame(self, frame, num_frames=1):
+        if not isinstance(frame, concurrent.futures.Future):
+            self.write_pending()
+            return super().add_frame(frame, num_frames)
+        # Время идет сразу, в писатель кадры уходят по порядку по готовности
+        self.time += num_frames / self.camera.frame_rate
+        self.pending.append((frame, num_frames))
+        while self.pending and self.pending[0][0].done():
+            self.write_pending(1)
+
+    def write_pending(self, count=None):
+        # Первые count (по умолчанию все) кадры очереди - в писатель, ожидая готовности
+        count = len(self.pending) if count is None else count
+        for _ in range(count):
+            future, num_frames = self.pending.popleft()
+            self.file_writer.write_frame(future.result(), num_frames)
+
+    def scene_finished(self, scene):
+        self.write_pending()
+        if self.producer_pool is not None:
+            self.producer_pool.shutdown()
+            self.producer_pool = None
+        super().scene_finished(scene)
+        ring = self.frame_ring
+        if ring.slots:
+            size = ring.slots * np.prod(ring.shape[0]) * np.dtype(ring.shape[1]).itemsize
+            logger.info(f"streaming: слотов {ring.slots} ({size / (1024 * 1024):.0f} МБ), "
+                        f"ожиданий кодировщика {ring.waits}")
@@ -0,0 +1,293 @@
+import atexit
+import configparser
+import hashlib
+import io
+import os
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from manim import __version__ as manim_version
+from manim import config, logger
+from manim.mobject.svg.svg_mobject import SVGMobject
+from manim.mobject.text import tex_mobject, text_mobject
+from manim.mobject.types.vectorized_mobject import VMobject
+from manim.utils import tex_file_writing
+
+CONFIG_FILE = Path(__file__).with_name("manim.cfg")
+
+# Поля VMobject, которых достаточно, чтобы восстановить распарсенный SVG
+ARRAY_FIELDS = ("points", "fill_rgbas", "stroke_rgbas", "background_stroke_rgbas")
+SCALAR_FIELDS = ("stroke_width", "background_stroke_width")
+
+
+def content_key(*parts):
+    hasher = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        hasher.update(len(data).to_bytes(8, "little"))
+        hasher.update(data)
+    return hasher.hexdigest()
+
+
+# === ХРАНИЛИЩЕ ПО ХЕШУ СОДЕРЖИМОГО ===
+
+class ContentStore:
+    def __init__(self, root, max_bytes=None, read_only=False):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+        self._size = None
+
+    def path(self, key, suffix):
+        return self.root / key[:2] / f"{key}{suffix}"
+
+    def get(self, key, suffix):
+        path = self.path(key, suffix)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        if not self.read_only:
+            # mtime служит отметкой последнего использования для LRU
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return data
+
+    def put(self, key, suffix, data):
+        if self.read_only:
+            return
+        path = self.path(key, suffix)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Атомарная запись: параллельные рендеры могут класть один и тот же ключ
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+
+        if self.max_bytes is not None:
+            if self._size is None:
+                self._size = self.total_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def entries(self):
+        if not self.root.is_dir():
+            return []
+        return [path for path in self.root.glob("*/*") if path.is_file() and path.suffix != ".tmp"]
+
+    def total_size(self):
+        return sum(path.stat().st_size for path in self.entries())
+
+    def evict(self, target_bytes=None):
+        # Удаляем давно не использованные записи, пока не уложимся в 90% лимита
+        if target_bytes is None:
+            target_bytes = int(self.max_bytes * 0.9)
+        entries = []
+        for path in self.entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        size = sum(entry[1] for entry in entries)
+        removed = 0
+        for _, entry_size, path in entries:
+            if size <= target_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            removed += 1
+        self._size = size
+        if removed:
+            logger.info(f"tex_cache: удалено {removed} старых записей из {self.root}")
+        return removed
+
+
+# === КЭШ TEX/TEXT ===
+
+class TexCache:
+    def __init__(self, cache_dir, shared_dirs=(), max_bytes=None):
+        self.local = ContentStore(cache_dir, max_bytes=max_bytes)
+        self.shared = [ContentStore(path, read_only=True) for path in shared_dirs]
+        self.stats = Counter()
+
+    def get(self, key, suffix):
+        for store in [self.local, *self.shared]:
+            data = store.get(key, suffix)
+            if data is not None:
+                if store is not self.local:
+                    # Переносим запись из общего каталога в локальный
+                    self.local.put(key, suffix, data)
+                return data
+        return None
+
+    def put(self, key, suffix, data):
+        self.local.put(key, suffix, data)
+
+    def report(self):
+        lines = []
+        for kind in ("tex", "text", "paths"):
+            hits, misses = self.stats[f"{kind}_hits"], self.stats[f"{kind}_misses"]
+            total = hits + misses
+            if total:
+                lines.append(f"{kind}: {hits}/{total} попаданий ({100 * hits / total:.0f}%)")
+        return ", ".join(lines)
+
+
+def pack_submobjects(submobjects):
+    arrays = {}
+    for field in ARRAY_FIELDS:
+        values = [np.asarray(getattr(mob, field), dtype=float) for mob in submobjects]
+        arrays[field] = np.concatenate(values) if values else np.zeros((0, 4))
+        arrays[f"{field}_offsets"] = np.cumsum([0] + [len(value) for value in values])
+    for field in SCALAR_FIELDS:
+        arrays[field] = np.array([float(getattr(mob, field)) for mob in submobjects])
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def unpack_submobjects(data):
+    arrays = np.load(io.BytesIO(data), allow_pickle=False)
+    count = len(arrays[SCALAR_FIELDS[0]])
+    submobjects = []
+    for index in range(count):
+        mob = VMobject()
+        for field in ARRAY_FIELDS:
+            offsets = arrays[f"{field}_offsets"]
+            setattr(mob, field, arrays[field][offsets[index]:offsets[index + 1]].copy())
+        for field in SCALAR_FIELDS:
+            setattr(mob, field, float(arrays[field][index]))
+        submobjects.append(mob)
+    return submobjects
+
+
+# === ПОДМЕНА ФУНКЦИЙ MANIM ===
+
+_cache = None
+_original_tex_to_svg_file = tex_file_writing.tex_to_svg_file
+_original_text2svg = text_mobject.Text._text2svg
+_original_generate_mobject = SVGMobject.generate_mobject
+
+
+def cached_tex_to_svg_file(expression, environment=None, tex_template=None):
+    if tex_template is None:
+        tex_template = config["tex_template"]
+    tex_file = tex_file_writing.generate_tex_file(expression, environment, tex_template)
+    svg_file = tex_file.with_suffix(".svg")
+
+    # Ключ - полный исходник (шаблон + выражение + окружение) и компилятор
+    key = content_key("tex", tex_file.read_text(encoding="utf-8"),
+                      tex_template.tex_compiler, tex_template.output_format)
+    if svg_file.exists():
+        _cache.stats["tex_hits"] += 1
+        if not _cache.local.path(key, ".svg").exists():
+            _cache.put(key, ".svg", svg_file.read_bytes())
+        return svg_file
+
+    data = _cache.get(key, ".svg")
+    if data is not None:
+        _cache.stats["tex_hits"] += 1
+        svg_file.write_bytes(data)
+        return svg_file
+
+    _cache.stats["tex_misses"] += 1
+    svg_file = _original_tex_to_svg_file(expression, environment, tex_template)
+    _cache.put(key, ".svg", Path(svg_file).read_bytes())
+    return svg_file
+
+
+def cached_text2svg(self, color, *args, **kwargs):
+    dir_name = config.get_dir("text_dir")
+    dir_name.mkdir(parents=True, exist_ok=True)
+    file_name = dir_name / (self._text2hash(color) + ".svg")
+    key = content_key("text", file_name.stem, config["pixel_width"], config["pixel_height"])
+
+    if not file_name.exists():
+        data = _cache.get(key, ".svg")
+        if data is not None:
+            file_name.write_bytes(data)
+    if file_name.exists():
+        _cache.stats["text_hits"] += 1
+        return str(file_name.resolve())
+
+    _cache.stats["text_misses"] += 1
+    svg_file = _original_text2svg(self, color, *args, **kwargs)
+    _cache.put(key, ".svg", Path(svg_file).read_bytes())
+    return svg_file
+
+
+def cached_generate_mobject(self):
+    # Переиспользуем уже распарсенные пути, а не только SVG-файл
+    file_path = self.get_file_path()
+    key = content_key(
+        "paths", file_path.read_bytes(), type(self).__name__, self.svg_default,
+        self.path_string_config, config.renderer, manim_version,
+    )
+    data = _cache.get(key, ".npz")
+    if data is not None:
+        _cache.stats["paths_hits"] += 1
+        self.add(*unpack_submobjects(data))
+        return
+
+    _cache.stats["paths_misses"] += 1
+    _original_generate_mobject(self)
+    if all(isinstance(mob, VMobject) and not mob.submobjects for mob in self.submobjects):
+        _cache.put(key, ".npz", pack_submobjects(self.submobjects))
+
+
+def read_settings(config_file=CONFIG_FILE):
+    parser = configparser.ConfigParser()
+    parser.read(config_file, encoding="utf-8")
+    section = parser["tex_cache"] if parser.has_section("tex_cache") else {}
+    base = Path(config_file).parent
+    shared = [item.strip() for item in section.get("shared_dirs", "").split(",") if item.strip()]
+    max_mb = section.get("max_size_mb", "").strip()
+    return {
+        "enabled": str(section.get("enabled", "True")).lower() in ("1", "true", "yes", "on"),
+        "cache_dir": base / section.get("cache_dir", "media/cache"),
+        "shared_dirs": [base / path for path in shared],
+        "max_bytes": int(float(max_mb) * 1024 * 1024) if max_mb else None,
+    }
+
+
+def install(cache_dir=None, shared_dirs=None, max_bytes=None):
+    global _cache
+    if _cache is not None:
+        return _cache
+
+    settings = read_settings()
+    if not settings["enabled"] and cache_dir is None:
+        return None
+    _cache = TexCache(
+        cache_dir or settings["cache_dir"],
+        settings["shared_dirs"] if shared_dirs is None else shared_dirs,
+        settings["max_bytes"] if max_bytes is None else max_bytes,
+    )
+
+    tex_file_writing.tex_to_svg_file = cached_tex_to_svg_file
+    tex_mobject.tex_to_svg_file = cached_tex_to_svg_file
+    text_mobject.Text._text2svg = cached_text2svg
+    SVGMobject.generate_mobject = cached_generate_mobject
+    atexit.register(log_stats)
+    return _cache
+
+
+def stats():
+    return dict(_cache.stats) if _cache is not None else {}
+
+
+def log_stats():
+    if _cache is not None and _cache.stats:
+        logger.info(f"tex_cache: {_cache.report()}")